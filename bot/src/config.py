@@ -28,6 +28,10 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4o"
     openai_transcription_model: str = "whisper-1"
 
+    # Photos are downscaled so their longer edge fits this many px before the
+    # vision call (0 disables; needs Pillow)
+    image_max_edge: int = 1568
+
     vault_path: Path = Field(default=Path.home())
     authorized_users: str = ""
     bot_language: str = "es"
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import json
 import logging
+import os
 import re
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, asdict
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
@@ -20,15 +27,30 @@ EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIM = 1536
 MAX_CHUNK_CHARS = 2000
 BATCH_SIZE = 64
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 300.0  # seconds
+QUERY_CACHE_MIN_SIM = 0.95
+QUERY_BATCH_MAX = 32
+QUERY_BATCH_WINDOW = 0.015  # seconds
+# The HNSW copy is rebuilt from scratch whenever the index changes, and its results
+# are approximate; a flat scan of a few thousand vectors takes about a millisecond,
+# so the graph only pays off once brute force itself is the bottleneck
+HNSW_MIN_VECTORS = 50_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# faiss drags in a large native library, so it is only imported on first use
+_HAS_FAISS = importlib.util.find_spec("faiss") is not None
+if not _HAS_FAISS:
+    logger.warning("faiss not installed – semantic search disabled")
+
 
-try:
+@lru_cache(maxsize=None)
+def _faiss():
     import faiss  # type: ignore[import-untyped]
 
-    _HAS_FAISS = True
-except ImportError:
-    faiss = None  # type: ignore[assignment]
-    _HAS_FAISS = False
-    logger.warning("faiss not installed – semantic search disabled")
+    return faiss
 
 
 # ---------------------------------------------------------------------------
@@ -136,24 +158,38 @@ def _load_manifest() -> dict:
     }
 
 
-def _save_manifest(manifest: dict) -> None:
+def _save_manifest(manifest: dict) -> Path:
+    """Write *manifest* to a temp file next to the real one and return its path."""
     mp = _manifest_path()
     mp.parent.mkdir(parents=True, exist_ok=True)
-    mp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp = mp.with_name(mp.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return tmp
 
 
 # ---------------------------------------------------------------------------
 # Embedding
 # ---------------------------------------------------------------------------
 
+_openai_client = None
+
+
+def _get_openai_client():
+    """Get or create the shared OpenAI client (reuses its HTTP connection pool)."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+
+        _openai_client = OpenAI(api_key=settings.openai_api_key)
+    return _openai_client
+
+
 def _embed_texts(texts: list[str]) -> list[list[float]]:
     if not settings.openai_api_key:
         logger.warning("OpenAI API key not set – cannot compute embeddings")
         return []
 
-    from openai import OpenAI
-
-    client = OpenAI(api_key=settings.openai_api_key)
+    client = _get_openai_client()
     all_embeddings: list[list[float]] = []
 
     for i in range(0, len(texts), BATCH_SIZE):
@@ -185,7 +221,21 @@ def _scan_vault_files() -> dict[str, Path]:
     return files
 
 
+# One refresh at a time: concurrent refreshes would embed the same files twice
+# and write the same index/manifest paths
+_index_lock = threading.Lock()
+# Held while the new index + manifest are swapped in, and while they're loaded,
+# so readers never pair a new index with an old manifest
+_swap_lock = threading.Lock()
+
+
 def ensure_index(force: bool = False) -> tuple[int, int, int]:
+    """Bring the on-disk index up to date with the vault. Blocking; serialized."""
+    with _index_lock:
+        return _ensure_index(force)
+
+
+def _ensure_index(force: bool) -> tuple[int, int, int]:
     if not _HAS_FAISS:
         logger.warning("FAISS unavailable – skipping index build")
         return (0, 0, 0)
@@ -194,10 +244,13 @@ def ensure_index(force: bool = False) -> tuple[int, int, int]:
         logger.warning("OpenAI API key not set – skipping index build")
         return (0, 0, 0)
 
+    global _loaded_index
+
     manifest = _load_manifest()
     ip = _index_path()
 
-    if force or manifest.get("model") != EMBEDDING_MODEL or manifest.get("dim") != EMBEDDING_DIM:
+    fresh = force or manifest.get("model") != EMBEDDING_MODEL or manifest.get("dim") != EMBEDDING_DIM
+    if fresh:
         manifest = {
             "model": EMBEDDING_MODEL,
             "dim": EMBEDDING_DIM,
@@ -205,22 +258,16 @@ def ensure_index(force: bool = False) -> tuple[int, int, int]:
             "files": {},
             "chunks": {},
         }
-        index = faiss.IndexIDMap2(faiss.IndexFlatIP(EMBEDDING_DIM))
-    elif ip.exists():
-        index = faiss.read_index(str(ip))
-    else:
-        index = faiss.IndexIDMap2(faiss.IndexFlatIP(EMBEDDING_DIM))
 
     vault_files = _scan_vault_files()
+    stale_ids: list[int] = []
 
     # Detect removed files
     removed_count = 0
     for rel in list(manifest["files"].keys()):
         if rel not in vault_files:
             info = manifest["files"].pop(rel)
-            for cid in info.get("chunk_ids", []):
-                index.remove_ids(np.array([cid], dtype=np.int64))
-                manifest["chunks"].pop(str(cid), None)
+            stale_ids.extend(info.get("chunk_ids", []))
             removed_count += 1
 
     # Detect new / changed files
@@ -232,11 +279,24 @@ def ensure_index(force: bool = False) -> tuple[int, int, int]:
             to_process.append((rel, path))
         elif prev["mtime"] != stat.st_mtime or prev["size"] != stat.st_size:
             # Remove old chunks first
-            for cid in prev.get("chunk_ids", []):
-                index.remove_ids(np.array([cid], dtype=np.int64))
-                manifest["chunks"].pop(str(cid), None)
+            stale_ids.extend(prev.get("chunk_ids", []))
             to_process.append((rel, path))
 
+    # Nothing to do: leave the index file (and the cached copy) untouched
+    if not fresh and not removed_count and not to_process and ip.exists():
+        return (0, 0, 0)
+
+    faiss = _faiss()
+    if fresh or not ip.exists():
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(EMBEDDING_DIM))
+    else:
+        index = faiss.read_index(str(ip))
+
+    if stale_ids:
+        index.remove_ids(np.array(stale_ids, dtype=np.int64))
+        for cid in stale_ids:
+            manifest["chunks"].pop(str(cid), None)
+
     added_count = 0
     updated_count = 0
 
@@ -282,10 +342,16 @@ def ensure_index(force: bool = False) -> tuple[int, int, int]:
                 else:
                     added_count += 1
 
-    # Persist
+    # Persist to temp files, then swap both into place
     ip.parent.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(ip))
-    _save_manifest(manifest)
+    index_tmp = ip.with_name(ip.name + ".tmp")
+    faiss.write_index(index, str(index_tmp))
+    manifest_tmp = _save_manifest(manifest)
+    with _swap_lock:
+        os.replace(index_tmp, ip)
+        os.replace(manifest_tmp, _manifest_path())
+        _loaded_index = None
+    _query_cache.clear()
 
     logger.info(
         "Index updated: added=%d, updated=%d, removed=%d", added_count, updated_count, removed_count
@@ -293,6 +359,172 @@ def ensure_index(force: bool = False) -> tuple[int, int, int]:
     return (added_count, updated_count, removed_count)
 
 
+# ---------------------------------------------------------------------------
+# Loaded index cache
+# ---------------------------------------------------------------------------
+# ((index mtime, manifest mtime), index, chunks); ensure_index drops it after
+# writing, and the mtime key also catches rebuilds from another process.
+# The on-disk index stays IndexIDMap2(IndexFlatIP) because incremental updates
+# need remove_ids, which HNSW lacks; large indexes get an HNSW copy for search.
+_loaded_index: tuple[tuple[float, float], object, dict] | None = None
+
+
+def _get_loaded_index() -> tuple[object, dict] | None:
+    """Return the on-disk index and its chunk map, re-reading only when they change."""
+    global _loaded_index
+    with _swap_lock:
+        try:
+            key = (_index_path().stat().st_mtime, _manifest_path().stat().st_mtime)
+        except FileNotFoundError:
+            return None
+        loaded = _loaded_index
+        if loaded is None or loaded[0] != key:
+            flat = _faiss().read_index(str(_index_path()))
+            chunks = _load_manifest()["chunks"]
+        else:
+            return loaded[1], loaded[2]
+    loaded = (key, _search_index(flat), chunks)
+    _loaded_index = loaded
+    return loaded[1], loaded[2]
+
+
+def _search_index(flat):
+    """Build an HNSW copy of *flat* for querying once it's large enough to pay off."""
+    n = flat.ntotal
+    if n < HNSW_MIN_VECTORS:
+        return flat
+
+    faiss = _faiss()
+    vectors = flat.index.reconstruct_n(0, n)
+    ids = faiss.vector_to_array(flat.id_map).astype(np.int64)
+
+    hnsw = faiss.IndexHNSWFlat(flat.d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+    index = faiss.IndexIDMap(hnsw)
+    index.add_with_ids(vectors, ids)
+    logger.info("Built HNSW search index over %d vectors", n)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Query cache
+# ---------------------------------------------------------------------------
+
+class _QueryCache:
+    """LRU of recent queries → results, also matched by embedding similarity.
+
+    Exact repeats skip the embedding call; rephrased queries whose unit
+    embedding has cosine >= ``min_sim`` with a cached one reuse its results.
+
+    Thread-safe: searches run both on the event loop and in worker threads.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, min_sim: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.min_sim = min_sim
+        self._lock = threading.Lock()
+        # key (top_k, query) -> (unit vector, results, stored_at)
+        self._entries: OrderedDict[tuple[int, str], tuple[np.ndarray, list[dict], float]] = OrderedDict()
+
+    def _expire(self) -> None:
+        # Caller holds self._lock
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, (_, _, ts) in self._entries.items() if ts < cutoff]:
+            del self._entries[key]
+
+    def get_exact(self, query: str, top_k: int) -> list[dict] | None:
+        with self._lock:
+            self._expire()
+            key = (top_k, query)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_similar(self, vec: np.ndarray, top_k: int) -> list[dict] | None:
+        with self._lock:
+            self._expire()
+            keys = [k for k in self._entries if k[0] == top_k]
+            if not keys:
+                return None
+            matrix = np.stack([self._entries[k][0] for k in keys])
+            sims = matrix @ vec
+            best = int(np.argmax(sims))
+            if sims[best] < self.min_sim:
+                return None
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][1]
+
+    def put(self, query: str, top_k: int, vec: np.ndarray, results: list[dict]) -> None:
+        with self._lock:
+            self._entries[(top_k, query)] = (vec, results, time.monotonic())
+            self._entries.move_to_end((top_k, query))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_query_cache = _QueryCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_CACHE_MIN_SIM)
+
+
+# ---------------------------------------------------------------------------
+# Query batching
+# ---------------------------------------------------------------------------
+# Queries arriving within QUERY_BATCH_WINDOW of each other share a single
+# embeddings request instead of paying one round-trip each.
+
+_query_queue: asyncio.Queue[tuple[str, asyncio.Future]] | None = None
+_query_worker: asyncio.Task | None = None
+
+
+async def encode_query_batched(query: str) -> np.ndarray | None:
+    """Embed *query* (unit length), coalescing with concurrent callers."""
+    global _query_queue, _query_worker
+
+    if _query_queue is None:
+        _query_queue = asyncio.Queue()
+    if _query_worker is None or _query_worker.done():
+        _query_worker = asyncio.create_task(_query_batch_worker(_query_queue))
+
+    fut: asyncio.Future = asyncio.get_running_loop().create_future()
+    await _query_queue.put((query, fut))
+    return await fut
+
+
+async def _query_batch_worker(queue: asyncio.Queue[tuple[str, asyncio.Future]]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + QUERY_BATCH_WINDOW
+        while len(batch) < QUERY_BATCH_MAX:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            vecs = await asyncio.to_thread(_embed_texts, [q for q, _ in batch])
+        except Exception as exc:
+            logger.warning("Batched query embedding failed: %s", exc)
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            continue
+
+        for i, (_, fut) in enumerate(batch):
+            if not fut.done():
+                fut.set_result(np.array(vecs[i], dtype=np.float32) if vecs else None)
+
+
 # ---------------------------------------------------------------------------
 # Search
 # ---------------------------------------------------------------------------
@@ -307,29 +539,70 @@ def semantic_search(query: str, top_k: int = 10) -> list[dict]:
 
     ensure_index()
 
-    ip = _index_path()
-    if not ip.exists():
-        return []
+    cached = _query_cache.get_exact(_cache_key(query), top_k)
+    if cached is not None:
+        return cached
 
-    index = faiss.read_index(str(ip))
-    if index.ntotal == 0:
+    if not _index_path().exists():
         return []
 
     vecs = _embed_texts([query])
     if not vecs:
         return []
 
-    q = np.array(vecs, dtype=np.float32)
-    scores, ids = index.search(q, min(top_k, index.ntotal))
+    return _search_vector(query, top_k, np.array(vecs[0], dtype=np.float32))
+
+
+async def semantic_search_batched(query: str, top_k: int = 10) -> list[dict]:
+    """Async ``semantic_search`` whose query embedding goes through the batcher."""
+    if not _HAS_FAISS:
+        return []
+
+    if not settings.openai_api_key:
+        logger.warning("OpenAI API key not set – cannot search")
+        return []
+
+    await asyncio.to_thread(ensure_index)
+
+    cached = _query_cache.get_exact(_cache_key(query), top_k)
+    if cached is not None:
+        return cached
+
+    if not _index_path().exists():
+        return []
+
+    vec = await encode_query_batched(query)
+    if vec is None:
+        return []
+
+    return await asyncio.to_thread(_search_vector, query, top_k, vec)
+
+
+def _cache_key(query: str) -> str:
+    return query.strip().lower()
+
+
+def _search_vector(query: str, top_k: int, vec: np.ndarray) -> list[dict]:
+    cached = _query_cache.get_similar(vec, top_k)
+    if cached is not None:
+        return cached
+
+    loaded = _get_loaded_index()
+    if loaded is None:
+        return []
+    index, chunks = loaded
+    if index.ntotal == 0:
+        return []
+
+    scores, ids = index.search(vec[None, :], min(top_k, index.ntotal))
 
-    manifest = _load_manifest()
     results: list[dict] = []
     for score, cid in zip(scores[0], ids[0]):
         if cid == -1:
             continue
         if score < 0.3:
             continue
-        chunk = manifest["chunks"].get(str(cid))
+        chunk = chunks.get(str(cid))
         if chunk is None:
             continue
         results.append(
@@ -342,6 +615,7 @@ def semantic_search(query: str, top_k: int = 10) -> list[dict]:
             }
         )
 
+    _query_cache.put(_cache_key(query), top_k, vec, results)
     return results
 
 
@@ -10,6 +10,7 @@ import json
 import logging
 import math
 import random
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -27,6 +28,7 @@ DEFAULT_EASE_FACTOR = 2.5
 MIN_EASE_FACTOR = 1.3
 DEFAULT_QUIZ_COUNT = 3
 DEEP_EXAM_COUNT = 8
+ITEMS_CACHE_TTL = 5.0  # seconds
 
 
 # ---------------------------------------------------------------------------
@@ -342,11 +344,40 @@ def _extract_card_content(title: str) -> dict | None:
 # ---------------------------------------------------------------------------
 # Reviewable items
 # ---------------------------------------------------------------------------
+# Bumped whenever the ordered list of reviewable titles changes, so callers
+# can cache per-title lookups across get_reviewable_items() calls.
+_items_version = 0
+_items_titles: tuple[str, ...] = ()
+
+
+def items_version() -> int:
+    """Version of the reviewable title list returned last by get_reviewable_items()."""
+    return _items_version
+
+
+# (monotonic time, vault.generation(), items) of the last scan
+_items_cache: tuple[float, int, list[dict]] | None = None
+
+
 def get_reviewable_items() -> list[dict]:
     """Get all items that can be quizzed on.
 
-    Returns a list of dicts with type, title, and content.
+    Returns a list of dicts with type, title, and content. Results are
+    reused for ITEMS_CACHE_TTL seconds unless the bot writes to the vault.
     """
+    global _items_cache
+    now = time.monotonic()
+    gen = vault.generation()
+    if _items_cache and _items_cache[1] == gen and now - _items_cache[0] < ITEMS_CACHE_TTL:
+        return _items_cache[2]
+
+    items = _scan_reviewable_items()
+    _items_cache = (now, gen, items)
+    return items
+
+
+def _scan_reviewable_items() -> list[dict]:
+    global _items_version, _items_titles
     items: list[dict] = []
 
     # Cards
@@ -381,16 +412,18 @@ def get_reviewable_items() -> list[dict]:
                 "status": status,
             })
 
+    titles = tuple(item["title"] for item in items)
+    if titles != _items_titles:
+        _items_titles = titles
+        _items_version += 1
+
     return items
 
 
-def get_due_items() -> list[dict]:
-    """Get items due for spaced repetition review (overdue or never reviewed)."""
-    tracker = load_tracker()
-    reviewable = get_reviewable_items()
+def _iter_due(reviewable: list[dict], tracker: dict):
+    """Yield the items of *reviewable* that are due, annotated with their priority."""
     today = datetime.now().strftime("%Y-%m-%d")
 
-    due: list[dict] = []
     for item in reviewable:
         section = "cards" if item["type"] == "card" else "encounters"
         tracked = tracker[section].get(item["title"])
@@ -399,16 +432,32 @@ def get_due_items() -> list[dict]:
             # Never reviewed — due immediately
             item["priority"] = 0
             item["never_reviewed"] = True
-            due.append(item)
+            yield item
         elif tracked.get("next_review", "9999-99-99") <= today:
             item["priority"] = 1
             item["never_reviewed"] = False
             item["ease_factor"] = tracked.get("ease_factor", DEFAULT_EASE_FACTOR)
-            due.append(item)
+            yield item
+
+
+def _due_order(item: dict) -> tuple:
+    # Overdue first (by priority), then by ease (harder first)
+    return (item.get("priority", 99), item.get("ease_factor", DEFAULT_EASE_FACTOR))
+
+
+def get_due_items() -> list[dict]:
+    """Get items due for spaced repetition review (overdue or never reviewed)."""
+    return sorted(_iter_due(get_reviewable_items(), load_tracker()), key=_due_order)
+
 
-    # Sort: overdue first (by priority), then by ease (harder first)
-    due.sort(key=lambda x: (x.get("priority", 99), x.get("ease_factor", DEFAULT_EASE_FACTOR)))
-    return due
+def get_next_due_item(items: list[dict] | None = None) -> dict | None:
+    """Get the single most urgent due item, or None if nothing is due.
+
+    Same ordering as get_due_items()[0] without sorting the whole list.
+    Pass *items* to reuse an existing get_reviewable_items() result.
+    """
+    reviewable = items if items is not None else get_reviewable_items()
+    return min(_iter_due(reviewable, load_tracker()), key=_due_order, default=None)
 
 
 # ---------------------------------------------------------------------------
@@ -475,6 +524,9 @@ RESPONSE JSON SCHEMA:
 }
 """
 
+_QUIZ_SYSTEM_MSG = {"role": "system", "content": QUIZ_SYSTEM_PROMPT}
+_EVALUATE_SYSTEM_MSG = {"role": "system", "content": EVALUATE_SYSTEM_PROMPT}
+
 
 def generate_questions(
     content: str,
@@ -496,12 +548,12 @@ def generate_questions(
     )
 
     messages = [
-        {"role": "system", "content": QUIZ_SYSTEM_PROMPT},
+        _QUIZ_SYSTEM_MSG,
         {"role": "user", "content": user_msg},
     ]
 
     try:
-        client = llm._create_client()
+        client = llm._get_client()
         response = client.chat.completions.create(
             model=settings.active_model,
             messages=messages,
@@ -552,12 +604,12 @@ def generate_connection_questions(items: list[dict], count: int = DEFAULT_QUIZ_C
     )
 
     messages = [
-        {"role": "system", "content": QUIZ_SYSTEM_PROMPT},
+        _QUIZ_SYSTEM_MSG,
         {"role": "user", "content": user_msg},
     ]
 
     try:
-        client = llm._create_client()
+        client = llm._get_client()
         response = client.chat.completions.create(
             model=settings.active_model,
             messages=messages,
@@ -599,12 +651,12 @@ def evaluate_answer(
     )
 
     messages = [
-        {"role": "system", "content": EVALUATE_SYSTEM_PROMPT},
+        _EVALUATE_SYSTEM_MSG,
         {"role": "user", "content": user_msg},
     ]
 
     try:
-        client = llm._create_client()
+        client = llm._get_client()
         response = client.chat.completions.create(
             model=settings.active_model,
             messages=messages,
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import io
 import logging
 import random
+import re
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain, islice, repeat
 
+from rapidfuzz import fuzz, process
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.ext import ApplicationHandlerStop, ContextTypes
 from telegram.constants import ChatAction
 
 from src.config import settings
@@ -19,6 +25,7 @@ from src.models import (
     MAX_TURN_CHARS,
     MAX_CONTEXT_CHARS,
     KEEP_LAST_TURNS,
+    SUMMARY_BUDGET,
 )
 from src import llm, vault, opencode, openlibrary, chaining, embeddings, scheduler, exam
 
@@ -30,6 +37,65 @@ _sessions: dict[int, SessionContext] = {}
 # In-memory quiz sessions (per user)
 _quiz_sessions: dict[int, exam.QuizSession] = {}
 
+# Strong refs to fire-and-forget tasks so they aren't GC'd mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+# Max Cards read/linked concurrently by /orphan --link
+ORPHAN_LINK_CONCURRENCY = 8
+
+# Max LLM requests in flight while a dump's photos/audios are processed concurrently
+LLM_CONCURRENCY = 5
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Per-user future of the latest capture, so results are handled in submission order
+_result_tails: dict[int, asyncio.Future] = {}
+
+# Markdown section separators
+_SEP_20 = "━" * 20
+_SEP_24 = "━" * 24
+
+# Max length of one outgoing message (Telegram's hard limit is 4096)
+TELEGRAM_CHUNK_LIMIT = 4000
+
+# Flattens line breaks in result snippets in a single C-level pass
+_NL_TABLE = str.maketrans({"\n": " ", "\r": " "})
+
+# Escapes pipes so entry previews don't break Markdown table cells
+_PIPE_TABLE = str.maketrans({"|": "\\|"})
+
+# Quiz question-type icons and summary status per score (0–5)
+_TYPE_ICONS: dict[str, str] = {
+    "recall": "🔄", "application": "🎯", "synthesis": "🧩",
+    "connection": "🔗", "contrast": "⚖️", "truefalse": "✅❌",
+}
+_STATUS_LUT: tuple[str, ...] = ("❌", "❌", "❌", "🟡", "✅", "✅")
+_ITEM_ICONS: dict[str, str] = {"card": "🗂️", "encounter": "📚"}
+
+# Agents accepted as the first /oc argument
+_KNOWN_AGENTS: frozenset[str] = frozenset({
+    "librarian", "developer", "reviewer", "connector", "writer", "archivist",
+    "examiner", "plan", "build", "explore", "general", "vision",
+})
+
+# Compact callback_data: one-char tag followed by the payload
+# (rating digit, or hex id of a pending_atomic proposal).
+_CB_RATE = "R"
+_CB_RATE_SKIP = "S"
+_CB_ATOMIC_YES = "A"
+_CB_ATOMIC_NO = "a"
+
+# /done rating keyboard is stateless, so build it once.
+_RATE_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("⭐ 1", callback_data=f"{_CB_RATE}1"),
+        InlineKeyboardButton("⭐ 2", callback_data=f"{_CB_RATE}2"),
+        InlineKeyboardButton("⭐ 3", callback_data=f"{_CB_RATE}3"),
+        InlineKeyboardButton("⭐ 4", callback_data=f"{_CB_RATE}4"),
+        InlineKeyboardButton("⭐ 5", callback_data=f"{_CB_RATE}5"),
+    ],
+    [InlineKeyboardButton("📖 Sigo leyendo (no terminado)", callback_data=_CB_RATE_SKIP)],
+])
+
 
 def _get_session(user_id: int) -> SessionContext:
     if user_id not in _sessions:
@@ -42,17 +108,42 @@ def _is_authorized(user_id: int) -> bool:
     return not allowed or user_id in allowed
 
 
-async def _check_auth(update: Update) -> bool:
+async def auth_middleware(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
+    """Reject unauthorized updates before any other handler runs.
+
+    Registered in group -1 so the check happens once per update.
+    """
     user = update.effective_user
     if not user or not _is_authorized(user.id):
         if update.message:
             await update.message.reply_text("⛔ No autorizado.")
-        return False
-    return True
+        elif update.callback_query:
+            # Answer so the client's button spinner stops
+            await update.callback_query.answer("⛔ No autorizado.")
+        raise ApplicationHandlerStop
+
+
+def _on_background_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and (exc := task.exception()):
+        logger.debug("Background task failed: %s", exc)
+
+
+def _send_typing(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show TYPING without waiting for Telegram's round-trip before doing the real work."""
+    task = asyncio.create_task(
+        ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
 
 
 # --- Conversation Memory Helpers ---
 
+# Rendered tags for build_telegram_context, one per enum member
+_ROLE_TAG = {r: r.value.upper() for r in TurnRole}
+_KIND_TAG = {k: ("" if k == TurnKind.TEXT else f"[{k.value}]") for k in TurnKind}
+
 
 def _add_turn(
     session: SessionContext,
@@ -61,25 +152,54 @@ def _add_turn(
     kind: TurnKind,
     text: str,
     book: str | None = None,
+    memory: str | None = None,
 ) -> None:
-    """Record a turn in conversation memory."""
+    """Record a turn in conversation memory.
+
+    ``memory`` is an optional one-line fact that feeds the conversation
+    summary in ``build_telegram_context``.
+    """
     mem = session.memory
     now = datetime.utcnow()
+    mem.last_activity = now
 
-    # Auto-clear stale context
-    if mem.last_activity and (now - mem.last_activity) > CONTEXT_TTL:
-        mem.turns.clear()
-        mem.summary = ""
+    cleaned = _clean_turn_text(text)
+    if len(mem.turns) == mem.turns.maxlen:
+        evicted = mem.turns[0]
+        mem.total_chars -= len(evicted.text)
+        if evicted.memory:
+            mem.archived.append(evicted)
+    mem.turns.append(
+        HistoryTurn(ts=now, role=role, kind=kind, text=cleaned, book=book, memory=memory)
+    )
+    mem.total_chars += len(cleaned)
 
-    mem.last_activity = now
 
+def _clean_turn_text(text: str) -> str:
+    """Stripped turn text, truncated to MAX_TURN_CHARS."""
+    # Common case: short text with no surrounding whitespace needs no copies
+    if len(text) <= MAX_TURN_CHARS and not text[:1].isspace() and not text[-1:].isspace():
+        return text
     cleaned = text.strip()
     if len(cleaned) > MAX_TURN_CHARS:
         cleaned = cleaned[:MAX_TURN_CHARS] + "…"
+    return cleaned
 
-    mem.turns.append(
-        HistoryTurn(ts=now, role=role, kind=kind, text=cleaned, book=book)
-    )
+
+async def session_gc_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Clear conversation memory of sessions idle for longer than CONTEXT_TTL.
+
+    Runs periodically on the job queue so ``_add_turn`` doesn't have to
+    check staleness on every turn.
+    """
+    cutoff = datetime.utcnow() - CONTEXT_TTL
+    for session in list(_sessions.values()):
+        mem = session.memory
+        if mem.last_activity and mem.last_activity < cutoff:
+            mem.turns.clear()
+            mem.archived.clear()
+            mem.last_activity = None
+            mem.total_chars = 0
 
 
 def _record_user_text(session: SessionContext, text: str) -> None:
@@ -94,12 +214,22 @@ def _record_user_voice(session: SessionContext, transcript: str) -> None:
     _add_turn(session, role=TurnRole.USER, kind=TurnKind.VOICE, text=transcript, book=session.active_book)
 
 
-def _record_command(session: SessionContext, command: str) -> None:
-    _add_turn(session, role=TurnRole.EVENT, kind=TurnKind.COMMAND, text=command, book=session.active_book)
+def _record_command(session: SessionContext, command: str, memory: str | None = None) -> None:
+    _add_turn(
+        session, role=TurnRole.EVENT, kind=TurnKind.COMMAND, text=command,
+        book=session.active_book, memory=memory,
+    )
 
 
-def _record_bot_reply(session: SessionContext, text: str) -> None:
-    _add_turn(session, role=TurnRole.BOT, kind=TurnKind.RESULT, text=text, book=session.active_book)
+def _record_bot_reply(session: SessionContext, text: str, memory: str | None = None) -> None:
+    # Skip re-recording the exact same reply right after itself (retries, double-taps)
+    turns = session.memory.turns
+    if turns and turns[-1].role is TurnRole.BOT and turns[-1].text == _clean_turn_text(text):
+        return
+    _add_turn(
+        session, role=TurnRole.BOT, kind=TurnKind.RESULT, text=text,
+        book=session.active_book, memory=memory,
+    )
 
 
 def build_telegram_context(session: SessionContext) -> str:
@@ -115,15 +245,38 @@ def build_telegram_context(session: SessionContext) -> str:
 
     lines: list[str] = []
 
-    if mem.summary:
-        lines.append("## Conversation summary (older)")
-        lines.append(mem.summary.strip())
+    # Newest facts first, whole lines only, until the budget is spent
+    fact_lines: list[str] = []
+    used = 0
+    for t in chain(reversed(recent), reversed(mem.archived)):
+        if not t.memory or t.ts < cutoff:
+            continue
+        line = f"- {t.memory}"
+        used += len(line) + bool(fact_lines)  # "\n" separator
+        if used > SUMMARY_BUDGET:
+            break
+        fact_lines.append(line)
+    facts = "\n".join(reversed(fact_lines))
+    if facts:
+        lines.append("## Conversation summary (facts)")
+        lines.append(facts)
         lines.append("")
 
+    window = recent[-KEEP_LAST_TURNS:]
+    if mem.total_chars > MAX_CONTEXT_CHARS:
+        # Over budget: older turns would be cut by the final truncation
+        # anyway, so only render the newest ones that fit.
+        budget = MAX_CONTEXT_CHARS
+        start = len(window)
+        while start > 0 and budget > 0:
+            start -= 1
+            budget -= len(window[start].text)
+        window = window[start:]
+
     lines.append("## Recent Telegram conversation")
-    for t in recent[-KEEP_LAST_TURNS:]:
-        tag = t.role.value.upper()
-        kind_tag = f"[{t.kind.value}]" if t.kind != TurnKind.TEXT else ""
+    for t in window:
+        tag = _ROLE_TAG[t.role]
+        kind_tag = _KIND_TAG[t.kind]
         book_tag = f" (book: {t.book})" if t.book else ""
         lines.append(f"- {tag}{kind_tag}{book_tag}: {t.text}")
 
@@ -144,50 +297,97 @@ def build_telegram_context(session: SessionContext) -> str:
 
 # --- Command Handlers ---
 
+_HELP_START = (
+    "🧠 *Librarian* — Tu asistente de lectura\n\n"
+    "Envíame:\n"
+    "📸 Foto de portada → identifico el libro\n"
+    "📸 Foto de página con etiqueta → extraigo y clasifico\n"
+    "💬 Texto → lo proceso como quote/idea/reflexión\n"
+    "🎤 Audio → transcribo y proceso\n\n"
+    "*Comandos:*\n"
+    "/book `título` — Establecer libro activo\n"
+    "/dump — Iniciar sesión de volcado\n"
+    "/done — Marcar libro como terminado\n"
+    "/status — Ver sesión actual\n"
+    "/atomic — Ver propuestas de notas atómicas\n"
+    "/search `término` — Buscar en vault\n"
+    "/reading — Dashboard de lectura\n"
+    "/orphan — Cards sin enlazar a MOCs\n"
+    "/find `título` — Buscar libros en Open Library\n"
+    "/reindex — Reindexar vault para búsqueda semántica\n"
+    "/jobs — Ver/ejecutar tareas programadas\n"
+    "/cachestats — Estadísticas de caché del LLM\n"
+    "/quiz `título` — Quiz rápido de retención\n"
+    "/exam `título` — Examen profundo\n"
+    "/score — Dashboard de retención\n"
+    "/review — Items pendientes de revisión\n"
+    "/chain `nombre` `tarea` — Cadena de agentes\n"
+    "/cancel — Resetear sesión\n"
+    "/oc — OpenCode con agente\n"
+    "/help — Mostrar esta ayuda"
+)
+
+_HELP_SEARCH = (
+    "🔍 *Búsqueda en vault*\n\n"
+    "Uso: `/search <término>` — Búsqueda simple\n"
+    "`/search --ai <término>` — Búsqueda semántica con IA\n\n"
+    "Ejemplo: `/search productividad`"
+)
+
+_HELP_FIND = (
+    "📚 *Buscar libros en Open Library*\n\n"
+    "Uso: `/find <título>` — Buscar libros por título, autor o ISBN\n\n"
+    "Ejemplos:\n"
+    "`/find Clean Code`\n"
+    "`/find Robert Martin`\n"
+    "`/find 9780132350884` (ISBN)"
+)
+
+_HELP_OPENCODE = (
+    "🤖 *OpenCode — AI Coding Agent*\n\n"
+    "Uso:\n"
+    "`/oc <tarea>` — Enviar tarea\n"
+    "`/oc [agente] <tarea>` — Usar agente específico\n"
+    "📸 Foto + `/oc <tarea>` como caption\n"
+    "↩️ Responde a una foto con `/oc <tarea>`\n\n"
+    "*Agentes disponibles:*\n"
+    "• `librarian` — Captura y procesamiento de lectura\n"
+    "• `reviewer` — Auditoría y mantenimiento del vault\n"
+    "• `connector` — Descubrir conexiones entre notas\n"
+    "• `writer` — Generar ensayos y síntesis\n"
+    "• `archivist` — Gestión de inbox y archivo\n"
+    "• `examiner` — Retención y repaso activo\n"
+    "• `developer` — Desarrollo de código\n\n"
+    "Ejemplos:\n"
+    "`/oc reviewer audit`\n"
+    "`/oc connector find connections`\n"
+    "`/oc writer essay about leadership`\n"
+    "`/oc archivist process inbox`"
+)
+
+_HELP_EXAM = (
+    "🧪 *Examen profundo*\n\n"
+    "Uso: `/exam <título>` — Examen de 8 preguntas sobre un libro o nota\n\n"
+    "Ejemplo: `/exam The Systemic CTO`"
+)
+
+# Built-in chains are static config, so their listing is too
+_HELP_CHAIN = "\n".join([
+    "🔗 *Cadenas de agentes disponibles*\n",
+    *(f"• `{c['name']}` — {c['description']}" for c in chaining.list_chains()),
+    "\nUso: `/chain <nombre> <tarea>`",
+])
+
 
 async def start_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
-    text = (
-        "🧠 *Librarian* — Tu asistente de lectura\n\n"
-        "Envíame:\n"
-        "📸 Foto de portada → identifico el libro\n"
-        "📸 Foto de página con etiqueta → extraigo y clasifico\n"
-        "💬 Texto → lo proceso como quote/idea/reflexión\n"
-        "🎤 Audio → transcribo y proceso\n\n"
-        "*Comandos:*\n"
-        "/book `título` — Establecer libro activo\n"
-        "/dump — Iniciar sesión de volcado\n"
-        "/done — Marcar libro como terminado\n"
-        "/status — Ver sesión actual\n"
-        "/atomic — Ver propuestas de notas atómicas\n"
-        "/search `término` — Buscar en vault\n"
-        "/reading — Dashboard de lectura\n"
-        "/orphan — Cards sin enlazar a MOCs\n"
-        "/find `título` — Buscar libros en Open Library\n"
-        "/reindex — Reindexar vault para búsqueda semántica\n"
-        "/jobs — Ver/ejecutar tareas programadas\n"
-        "/quiz `título` — Quiz rápido de retención\n"
-        "/exam `título` — Examen profundo\n"
-        "/score — Dashboard de retención\n"
-        "/review — Items pendientes de revisión\n"
-        "/chain `nombre` `tarea` — Cadena de agentes\n"
-        "/cancel — Resetear sesión\n"
-        "/oc — OpenCode con agente\n"
-        "/help — Mostrar esta ayuda"
-    )
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await update.message.reply_text(_HELP_START, parse_mode="Markdown")
 
 
 async def help_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     await start_handler(update, ctx)
 
 
 async def book_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
 
     if not ctx.args:
@@ -205,7 +405,7 @@ async def book_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         session.active_book = existing
         reply = f"📖 Libro activo: *{existing}* (encontrado en vault)"
         await update.message.reply_text(reply, parse_mode="Markdown")
-        _record_bot_reply(session, reply)
+        _record_bot_reply(session, reply, memory=f"active book set to '{existing}' (exists in vault)")
     else:
         safe = vault.sanitize_filename(title)
         session.active_book = safe
@@ -215,18 +415,16 @@ async def book_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
             f"💡 Envía una foto de la portada para que extraiga autor y metadata."
         )
         await update.message.reply_text(reply, parse_mode="Markdown")
-        _record_bot_reply(session, reply)
+        _record_bot_reply(session, reply, memory=f"active book set to '{safe}' (not yet in vault)")
 
 
 async def dump_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
     session.is_dump_session = True
     session.entries_this_session = 0
     session.pending_retries = []
 
-    _record_command(session, "/dump")
+    _record_command(session, "/dump", memory="dump session started")
 
     book_msg = f" — Libro: *{session.active_book}*" if session.active_book else ""
     reply = (
@@ -239,8 +437,6 @@ async def dump_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 async def done_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
     _record_command(session, "/done")
 
@@ -248,17 +444,6 @@ async def done_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text("No hay libro activo.")
         return
 
-    keyboard = [
-        [
-            InlineKeyboardButton("⭐ 1", callback_data="rate:1"),
-            InlineKeyboardButton("⭐ 2", callback_data="rate:2"),
-            InlineKeyboardButton("⭐ 3", callback_data="rate:3"),
-            InlineKeyboardButton("⭐ 4", callback_data="rate:4"),
-            InlineKeyboardButton("⭐ 5", callback_data="rate:5"),
-        ],
-        [InlineKeyboardButton("📖 Sigo leyendo (no terminado)", callback_data="rate:skip")],
-    ]
-
     summary = f"📊 Sesión: *{session.entries_this_session}* entradas capturadas\n"
     if session.pending_retries:
         summary += f"⚠️ {len(session.pending_retries)} fotos sin procesar\n"
@@ -267,14 +452,12 @@ async def done_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
     await update.message.reply_text(
         f"{summary}\n¿Has terminado el libro *{session.active_book}*?\nValóralo:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_RATE_KEYBOARD,
         parse_mode="Markdown",
     )
 
 
 async def status_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
     _record_command(session, "/status")
 
@@ -300,24 +483,22 @@ async def status_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
 
 
 async def atomic_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
 
     if not session.pending_atomic:
         await update.message.reply_text("No hay propuestas de notas atómicas pendientes.")
         return
 
-    for i, proposal in enumerate(session.pending_atomic):
+    for i, (proposal_id, proposal) in enumerate(session.pending_atomic.items(), 1):
         mocs = ", ".join(proposal.related_mocs) if proposal.related_mocs else "—"
         keyboard = [
             [
-                InlineKeyboardButton("✅ Crear", callback_data=f"atomic:yes:{i}"),
-                InlineKeyboardButton("❌ Descartar", callback_data=f"atomic:no:{i}"),
+                InlineKeyboardButton("✅ Crear", callback_data=f"{_CB_ATOMIC_YES}{proposal_id:x}"),
+                InlineKeyboardButton("❌ Descartar", callback_data=f"{_CB_ATOMIC_NO}{proposal_id:x}"),
             ]
         ]
         await update.message.reply_text(
-            f"💡 *Propuesta #{i + 1}*\n\n"
+            f"💡 *Propuesta #{i}*\n\n"
             f"📌 *{proposal.title}*\n"
             f"💭 {proposal.idea}\n"
             f"📚 Origen: {proposal.origin}\n"
@@ -328,8 +509,6 @@ async def atomic_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
 
 
 async def cancel_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     user_id = update.effective_user.id
     _sessions[user_id] = SessionContext()  # clears memory too
     await update.message.reply_text("🔄 Sesión reseteada.")
@@ -340,19 +519,17 @@ async def cancel_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
 # ============================================
 
 
+def _format_semantic_hit(i: int, r: dict) -> str:
+    """Render one semantic search result for /search --ai."""
+    score_pct = int(r["score"] * 100)
+    snippet = r["text"][:80].translate(_NL_TABLE)
+    return f"{i}. *{r['title']}* — {r['section']}\n   _{snippet}..._ ({score_pct}%)"
+
+
 async def search_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /search command - Search vault for Cards and Encounters."""
-    if not await _check_auth(update):
-        return
-    
     if not ctx.args:
-        await update.message.reply_text(
-            "🔍 *Búsqueda en vault*\n\n"
-            "Uso: `/search <término>` — Búsqueda simple\n"
-            "`/search --ai <término>` — Búsqueda semántica con IA\n\n"
-            "Ejemplo: `/search productividad`",
-            parse_mode="Markdown",
-        )
+        await update.message.reply_text(_HELP_SEARCH, parse_mode="Markdown")
         return
     
     # Parse arguments
@@ -373,37 +550,28 @@ async def search_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
     _record_command(session, f"/search {query}")
     
     await update.message.reply_text(f"🔍 Buscando: *{query}*...")
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
     
     # Perform search
     parts: list[str] = []
 
     if use_llm:
         # Semantic search with FAISS embeddings
-        semantic_results = embeddings.semantic_search(query, top_k=10)
-
-        if not semantic_results:
-            # Fallback to keyword search
-            cards_results, encounters_results = vault.search_vault(query)
-            if not cards_results and not encounters_results:
-                reply = f"🔍 *Resultados para:* '{query}'\n\n❌ No se encontraron resultados."
-                await update.message.reply_text(reply, parse_mode="Markdown")
-                _record_bot_reply(session, reply)
-                return
-            parts.append(f"🔍 *Resultados para:* '{query}' _(fallback a keyword)_\n")
-        else:
+        semantic_results = await embeddings.semantic_search_batched(query, top_k=10)
+
+        if semantic_results:
             parts.append(f"🧠 *Búsqueda semántica:* '{query}'\n")
-            for i, r in enumerate(semantic_results[:10], 1):
-                score_pct = int(r["score"] * 100)
-                snippet = r["text"][:80].replace("\n", " ")
-                parts.append(f"{i}. *{r['title']}* — {r['section']}")
-                parts.append(f"   _{snippet}..._ ({score_pct}%)")
+            parts.append("\n".join(
+                _format_semantic_hit(i, r)
+                for i, r in enumerate(islice(semantic_results, 10), 1)
+            ))
             reply = "\n".join(parts)
             await update.message.reply_text(reply, parse_mode="Markdown")
             _record_bot_reply(session, reply)
             return
 
-    cards_results, encounters_results = vault.search_vault(query)
+    # Keyword search (also the fallback when semantic search finds nothing)
+    cards_results, encounters_results = await asyncio.to_thread(vault.search_vault, query)
 
     if not cards_results and not encounters_results:
         reply = (
@@ -414,24 +582,27 @@ async def search_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
         _record_bot_reply(session, reply)
         return
 
-    parts.append(f"🔍 *Resultados para:* '{query}'\n")
+    fallback_note = " _(fallback a keyword)_" if use_llm else ""
+    parts.append(f"🔍 *Resultados para:* '{query}'{fallback_note}\n")
 
     if encounters_results:
         parts.append(f"\n📚 *ENCOUNTERS ({len(encounters_results)})*")
-        parts.append("━" * 20)
-        for r in encounters_results[:10]:
-            pages_info = f" ({', '.join(r.get('pages', [])[:3])})" if r.get('pages') else ""
-            parts.append(f"• {r['title']}{pages_info}")
-        if len(encounters_results) > 10:
-            parts.append(f"  ...y {len(encounters_results) - 10} más")
+        parts.append(_SEP_20)
+        parts.append("\n".join(
+            f"• {r['title']}" + (f" ({', '.join(pages[:3])})" if (pages := r.get("pages")) else "")
+            for r in islice(encounters_results, 10)
+        ))
+        overflow = len(encounters_results) - 10
+        if overflow > 0:
+            parts.append(f"  ...y {overflow} más")
 
     if cards_results:
         parts.append(f"\n🗂️ *CARDS ({len(cards_results)})*")
-        parts.append("━" * 20)
-        for r in cards_results[:10]:
-            parts.append(f"• {r['title']}")
-        if len(cards_results) > 10:
-            parts.append(f"  ...y {len(cards_results) - 10} más")
+        parts.append(_SEP_20)
+        parts.append("\n".join(f"• {r['title']}" for r in islice(cards_results, 10)))
+        overflow = len(cards_results) - 10
+        if overflow > 0:
+            parts.append(f"  ...y {overflow} más")
 
     parts.append("\n💡 Usa `/search --ai <término>` para búsqueda semántica")
 
@@ -440,16 +611,44 @@ async def search_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
     _record_bot_reply(session, reply)
 
 
+def _format_reading_book(book: dict) -> str:
+    """Render one in-progress book for the /reading dashboard."""
+    title = book.get("title", "")
+    author = book.get("author", "")
+    entries = book.get("entries_count", 0)
+    updated = book.get("updated", "")
+    rating = book.get("rating", 0)
+    
+    # Format updated date
+    if not updated:
+        updated_str = "—"
+    elif len(updated) == 16 and updated[4] == "-" and updated[7] == "-" and updated[10] == " ":
+        # Fixed-width "%Y-%m-%d %H:%M" as written by the vault
+        updated_str = updated[:10]
+    else:
+        try:
+            dt = datetime.strptime(updated, "%Y-%m-%d %H:%M")
+            updated_str = dt.strftime("%Y-%m-%d")
+        except ValueError:
+            updated_str = updated
+    
+    author_line = f"\n   Autor: {author}" if author else ""
+    rating_line = f"\n   Valoración: {'⭐' * rating}" if rating > 0 else ""
+    return (
+        f"\n📖 *{title}*{author_line}\n"
+        f"   Estado: 📖 En progreso\n"
+        f"   Entradas: {entries} bookmarks\n"
+        f"   Última act.: {updated_str}{rating_line}"
+    )
+
+
 async def reading_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /reading command - Dashboard de lectura."""
-    if not await _check_auth(update):
-        return
-    
     session = _get_session(update.effective_user.id)
     _record_command(session, "/reading")
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
     
-    books = vault.get_reading_dashboard()
+    books = await asyncio.to_thread(vault.get_reading_dashboard)
     
     if not books:
         await update.message.reply_text(
@@ -460,68 +659,67 @@ async def reading_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> Non
         )
         return
     
-    # Separate in-progress and done books
-    in_progress = [b for b in books if b.get("status") == "in-progress"]
-    done = [b for b in books if b.get("status") == "done"]
+    # Single pass: format in-progress books and count entries/done as we go
+    in_progress_blocks: list[str] = []
+    total_entries = 0
+    done_count = 0
+    for book in books:
+        status = book.get("status")
+        if status == "in-progress":
+            total_entries += book.get("entries_count", 0)
+            in_progress_blocks.append(_format_reading_book(book))
+        elif status == "done":
+            done_count += 1
     
     parts: list[str] = ["📚 *TUS LIBROS EN LECTURA*\n"]
-    parts.append("━" * 24)
+    parts.append(_SEP_24)
     
-    if not in_progress:
+    if not in_progress_blocks:
         parts.append("\n📖 No hay libros en progreso.")
     else:
-        total_entries = 0
-        for book in in_progress:
-            title = book.get("title", "")
-            author = book.get("author", "")
-            entries = book.get("entries_count", 0)
-            updated = book.get("updated", "")
-            rating = book.get("rating", 0)
-            
-            total_entries += entries
-            
-            # Format rating
-            rating_str = "⭐" * rating if rating > 0 else "—"
-            
-            # Format updated date
-            if updated:
-                try:
-                    # Parse and format date
-                    from datetime import datetime
-                    dt = datetime.strptime(updated, "%Y-%m-%d %H:%M")
-                    updated_str = dt.strftime("%Y-%m-%d")
-                except ValueError:
-                    updated_str = updated
-            else:
-                updated_str = "—"
-            
-            parts.append(f"\n📖 *{title}*")
-            if author:
-                parts.append(f"   Autor: {author}")
-            parts.append(f"   Estado: 📖 En progreso")
-            parts.append(f"   Entradas: {entries} bookmarks")
-            parts.append(f"   Última act.: {updated_str}")
-            if rating > 0:
-                parts.append(f"   Valoración: {rating_str}")
-        
-        parts.append("\n" + "━" * 24)
-        parts.append(f"💡 Total: {len(in_progress)} libro(s) en progreso")
+        parts.append("\n".join(in_progress_blocks))
+        parts.append("\n" + _SEP_24)
+        parts.append(f"💡 Total: {len(in_progress_blocks)} libro(s) en progreso")
         parts.append(f"📊 Total de entradas: {total_entries}")
     
     # Show done books count
-    if done:
-        parts.append(f"\n✅ {len(done)} libro(s) terminado(s)")
+    if done_count:
+        parts.append(f"\n✅ {done_count} libro(s) terminado(s)")
     
     reply = "\n".join(parts)
     await update.message.reply_text(reply, parse_mode="Markdown")
     _record_bot_reply(session, reply)
 
 
+def _orphan_suggestions(title: str, moc_index: dict[str, list[str]]) -> list[str]:
+    """Read a Card and suggest MOCs for it. Blocking; run in a worker thread."""
+    content = vault.get_card_content(title)
+    return vault.suggest_moc_connections(title, content, moc_index) if content else []
+
+
+def _link_suggestions(contents: dict[str, str]) -> list[tuple[str, list[str]]]:
+    """(title, suggested MOCs) for each Card that has suggestions. Blocking; run in a worker thread."""
+    moc_index = vault.build_moc_index()
+    return [
+        (title, suggestions)
+        for title, content in contents.items()
+        if (suggestions := vault.suggest_moc_connections(title, content, moc_index))
+    ]
+
+
+def _format_orphan(i: int, orphan: dict, suggestions: list[str]) -> str:
+    """Render one orphan Card entry for the /orphan list."""
+    snippet = orphan.get("snippet", "")[:50]
+    lines = [f"\n{i}. *{orphan['title']}*"]
+    if snippet:
+        lines.append(f"   📝 {snippet}...")
+    if suggestions:
+        lines.append(f"   💡 Sugerencias: {', '.join(suggestions)}")
+    return "\n".join(lines)
+
+
 async def orphan_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /orphan command - Find and reconnect orphan Cards."""
-    if not await _check_auth(update):
-        return
-    
     session = _get_session(update.effective_user.id)
     _record_command(session, "/orphan")
     
@@ -531,9 +729,9 @@ async def orphan_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
     list_only = "--list" in args or "-s" in args
     auto_link = "--link" in args or "-l" in args
     
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
     
-    orphans = vault.find_orphan_cards()
+    orphans = await asyncio.to_thread(vault.find_orphan_cards)
     
     if not orphans:
         await update.message.reply_text(
@@ -546,16 +744,17 @@ async def orphan_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
     
     # If auto_link flag is set, suggest connections automatically
     if auto_link:
-        mocs = vault.list_mocs()
-        connected_count = 0
-        
-        for orphan in orphans:
-            content = vault.get_card_content(orphan["title"])
-            if content:
-                suggestions = vault.suggest_moc_connections(orphan["title"], content)
-                if suggestions:
-                    vault.link_card_to_moc(orphan["title"], suggestions)
-                    connected_count += 1
+        contents = await vault.get_card_contents_async([o["title"] for o in orphans])
+        to_link = await asyncio.to_thread(_link_suggestions, contents)
+
+        sem = asyncio.Semaphore(ORPHAN_LINK_CONCURRENCY)
+
+        async def link_one(title: str, suggestions: list[str]) -> None:
+            async with sem:
+                await asyncio.to_thread(vault.link_card_to_moc, title, suggestions)
+
+        await asyncio.gather(*(link_one(t, sugg) for t, sugg in to_link))
+        connected_count = len(to_link)
         
         await update.message.reply_text(
             f"🗂️ *Reconexión de Cards*\n\n"
@@ -567,28 +766,25 @@ async def orphan_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
     
     # List orphans with suggestions
     parts: list[str] = ["🗂️ *CARDS HUÉRFANAS* (sin enlazar a MOCs)\n"]
-    parts.append("━" * 24)
+    parts.append(_SEP_24)
     
-    mocs = vault.list_mocs()
+    moc_index = await asyncio.to_thread(vault.build_moc_index)
     
-    for i, orphan in enumerate(orphans[:10], 1):
-        title = orphan["title"]
-        snippet = orphan.get("snippet", "")[:50]
-        
-        # Get suggestions
-        content = vault.get_card_content(title)
-        suggestions = vault.suggest_moc_connections(title, content or "") if content else []
-        
-        parts.append(f"\n{i}. *{title}*")
-        if snippet:
-            parts.append(f"   📝 {snippet}...")
-        if suggestions:
-            parts.append(f"   💡 Sugerencias: {', '.join(suggestions)}")
+    shown = orphans[:10]
+    all_suggestions = await asyncio.gather(
+        *(asyncio.to_thread(_orphan_suggestions, o["title"], moc_index) for o in shown)
+    )
+    
+    parts.append("\n".join(
+        _format_orphan(i, orphan, suggestions)
+        for i, (orphan, suggestions) in enumerate(zip(shown, all_suggestions), 1)
+    ))
     
-    if len(orphans) > 10:
-        parts.append(f"\n...y {len(orphans) - 10} más")
+    overflow = len(orphans) - 10
+    if overflow > 0:
+        parts.append(f"\n...y {overflow} más")
     
-    parts.append("\n" + "━" * 24)
+    parts.append("\n" + _SEP_24)
     parts.append(f"💡 {len(orphans)} Cards sin enlazar")
     parts.append("\nUsa `/orphan --link` para conectar automáticamente")
     parts.append("Usa `/orphan --list` para ver solo la lista")
@@ -603,19 +799,8 @@ async def find_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         /find <título> — Buscar libros por título, autor o ISBN
         /find "Clean Code" — Buscar con comillas para frases exactas
     """
-    if not await _check_auth(update):
-        return
-    
     if not ctx.args:
-        await update.message.reply_text(
-            "📚 *Buscar libros en Open Library*\n\n"
-            "Uso: `/find <título>` — Buscar libros por título, autor o ISBN\n\n"
-            "Ejemplos:\n"
-            "`/find Clean Code`\n"
-            "`/find Robert Martin`\n"
-            "`/find 9780132350884` (ISBN)",
-            parse_mode="Markdown",
-        )
+        await update.message.reply_text(_HELP_FIND, parse_mode="Markdown")
         return
     
     query = " ".join(ctx.args)
@@ -623,7 +808,7 @@ async def find_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     _record_command(session, f"/find {query}")
     
     # Show typing status
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
     
     await update.message.reply_text(
         f"🔍 Buscando libros en Open Library: *{query}*...",
@@ -654,15 +839,13 @@ async def find_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def reindex_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /reindex command — rebuild the semantic search index."""
-    if not await _check_auth(update):
-        return
-
     force = ctx.args and ctx.args[0] == "--force"
     await update.message.reply_text("🔄 Actualizando índice semántico...")
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
 
     try:
-        added, updated, removed = embeddings.ensure_index(force=force)
+        # Same locked path as /search --ai, off the event loop
+        added, updated, removed = await asyncio.to_thread(embeddings.ensure_index, force=bool(force))
         stats = embeddings.index_stats()
         reply = (
             f"✅ *Índice actualizado*\n\n"
@@ -680,16 +863,13 @@ async def reindex_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> Non
 
 async def jobs_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /jobs command — list and trigger scheduled jobs."""
-    if not await _check_auth(update):
-        return
-
     args = list(ctx.args) if ctx.args else []
 
     # /jobs run <name> — trigger a job immediately
     if len(args) >= 2 and args[0] == "run":
         job_name = args[1]
         await update.message.reply_text(f"⏳ Ejecutando tarea *{job_name}*...", parse_mode="Markdown")
-        await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+        _send_typing(update, ctx)
         try:
             result = await scheduler.run_job_now(job_name, ctx.bot)
             if len(result) > 3900:
@@ -715,20 +895,22 @@ async def jobs_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text("\n".join(parts), parse_mode="Markdown")
 
 
+async def cachestats_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /cachestats command — LLM response cache hit rates."""
+    parts = ["📊 *Caché del LLM*\n"]
+    for name, (hits, misses, size) in llm.cache_stats().items():
+        total = hits + misses
+        rate = f"{hits / total:.0%}" if total else "—"
+        parts.append(f"*{name}*: {hits}/{total} aciertos ({rate}), {size} entradas")
+    await update.message.reply_text("\n".join(parts), parse_mode="Markdown")
+
+
 async def chain_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /chain command — run a predefined agent chain."""
-    if not await _check_auth(update):
-        return
-
     args = list(ctx.args) if ctx.args else []
 
     if not args:
-        chains = chaining.list_chains()
-        parts = ["🔗 *Cadenas de agentes disponibles*\n"]
-        for c in chains:
-            parts.append(f"• `{c['name']}` — {c['description']}")
-        parts.append("\nUso: `/chain <nombre> <tarea>`")
-        await update.message.reply_text("\n".join(parts), parse_mode="Markdown")
+        await update.message.reply_text(_HELP_CHAIN, parse_mode="Markdown")
         return
 
     chain_name = args[0]
@@ -747,7 +929,7 @@ async def chain_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     _record_command(session, f"/chain {chain_name} {prompt}")
 
     step_names = " → ".join(s.agent for s in chain_steps)
-    await update.message.reply_text(
+    status_msg = await update.message.reply_text(
         f"🔗 Ejecutando cadena: *{step_names}*\n⏳ Esto puede tardar...",
         parse_mode="Markdown",
     )
@@ -765,16 +947,24 @@ async def chain_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         if result.output:
             response += f"Resultado parcial:\n{result.output}"
 
-    if len(response) > 4000:
-        for chunk_start in range(0, len(response), 3900):
-            chunk = response[chunk_start : chunk_start + 3900]
-            await update.message.reply_text(chunk, parse_mode="Markdown")
-    else:
-        await update.message.reply_text(response, parse_mode="Markdown")
+    chunks = _pack_chunks([response])
+
+    # The "⏳ Ejecutando" status message becomes the first chunk; the rest
+    # follow in order (concurrent sends could arrive out of order).
+    await status_msg.edit_text(chunks[0], parse_mode="Markdown")
+    for chunk in chunks[1:]:
+        await update.message.reply_text(chunk, parse_mode="Markdown")
 
     _record_bot_reply(session, response[:800])
 
 
+async def _download_bytes(file) -> bytes:
+    """Download a Telegram file straight into a BytesIO (no bytearray→bytes copy)."""
+    buf = io.BytesIO()
+    await file.download_to_memory(out=buf)
+    return buf.getvalue()
+
+
 async def opencode_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /opencode and /oc commands to send tasks to OpenCode.
 
@@ -786,35 +976,31 @@ async def opencode_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
         📸 foto + caption /oc <tarea>  - Foto con prompt en caption
         (reply a foto) /oc <tarea>     - Foto desde mensaje al que respondes
     """
-    if not await _check_auth(update):
-        return
-
     msg = update.message
 
     # --- Collect text args ---
     # CommandHandler fills ctx.args for text messages.
     # For photos with caption (MessageHandler), we parse manually.
     if ctx.args:
-        args = list(ctx.args)
+        text = " ".join(ctx.args)
     elif msg.caption:
-        # Parse caption: strip /oc or /opencode prefix
-        parts = msg.caption.split()
+        # Parse caption: strip /oc or /opencode prefix (only the first token is split off)
+        parts = msg.caption.split(maxsplit=1)
         if parts and parts[0].lower() in ("/oc", "/opencode"):
-            args = parts[1:]
+            text = parts[1] if len(parts) > 1 else ""
         else:
-            args = parts
+            text = msg.caption.strip()
     else:
-        args = []
+        text = ""
 
     # --- Collect images ---
-    images: list[tuple[bytes, str]] = []
+    # Gather (file_id, mime) first, then download them all concurrently.
+    sources: list[tuple[str, str]] = []
 
     # Case 1: Photo sent directly with /oc as caption
     if msg.photo:
         photo = msg.photo[-1]  # highest resolution
-        file = await ctx.bot.get_file(photo.file_id)
-        data = await file.download_as_bytearray()
-        images.append((bytes(data), "image/jpeg"))
+        sources.append((photo.file_id, "image/jpeg"))
 
     # Case 2: /oc as reply to a message with photo(s)
     elif msg.reply_to_message:
@@ -822,60 +1008,39 @@ async def opencode_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
 
         if reply.photo:
             photo = reply.photo[-1]
-            file = await ctx.bot.get_file(photo.file_id)
-            data = await file.download_as_bytearray()
-            images.append((bytes(data), "image/jpeg"))
+            sources.append((photo.file_id, "image/jpeg"))
 
         # Reply to a document that is an image (e.g. uncompressed photo)
         elif reply.document and reply.document.mime_type and reply.document.mime_type.startswith("image/"):
-            file = await ctx.bot.get_file(reply.document.file_id)
-            data = await file.download_as_bytearray()
-            images.append((bytes(data), reply.document.mime_type))
+            sources.append((reply.document.file_id, reply.document.mime_type))
 
         # Reply to a media group: only the replied-to message is available,
         # but include its caption as extra context if no args provided
-        if not args and reply.caption:
-            args = reply.caption.split()
+        if not text and reply.caption:
+            text = reply.caption.strip()
 
     # Case 3: Document sent directly with /oc that is an image
-    if not images and msg.document and msg.document.mime_type and msg.document.mime_type.startswith("image/"):
-        file = await ctx.bot.get_file(msg.document.file_id)
-        data = await file.download_as_bytearray()
-        images.append((bytes(data), msg.document.mime_type))
+    if not sources and msg.document and msg.document.mime_type and msg.document.mime_type.startswith("image/"):
+        sources.append((msg.document.file_id, msg.document.mime_type))
+
+    images: list[tuple[bytes, str]] = []
+    if sources:
+        files = await asyncio.gather(*(ctx.bot.get_file(file_id) for file_id, _ in sources))
+        datas = await asyncio.gather(*(_download_bytes(f) for f in files))
+        images = [(data, mime) for data, (_, mime) in zip(datas, sources)]
 
     # --- No args and no images: show help ---
-    if not args and not images:
-        await msg.reply_text(
-            "🤖 *OpenCode — AI Coding Agent*\n\n"
-            "Uso:\n"
-            "`/oc <tarea>` — Enviar tarea\n"
-            "`/oc [agente] <tarea>` — Usar agente específico\n"
-            "📸 Foto + `/oc <tarea>` como caption\n"
-            "↩️ Responde a una foto con `/oc <tarea>`\n\n"
-            "*Agentes disponibles:*\n"
-            "• `librarian` — Captura y procesamiento de lectura\n"
-            "• `reviewer` — Auditoría y mantenimiento del vault\n"
-            "• `connector` — Descubrir conexiones entre notas\n"
-            "• `writer` — Generar ensayos y síntesis\n"
-            "• `archivist` — Gestión de inbox y archivo\n"
-            "• `examiner` — Retención y repaso activo\n"
-            "• `developer` — Desarrollo de código\n\n"
-            "Ejemplos:\n"
-            "`/oc reviewer audit`\n"
-            "`/oc connector find connections`\n"
-            "`/oc writer essay about leadership`\n"
-            "`/oc archivist process inbox`",
-            parse_mode="Markdown",
-        )
+    if not text and not images:
+        await msg.reply_text(_HELP_OPENCODE, parse_mode="Markdown")
         return
 
     # --- Parse agent and prompt ---
     agent = None
-    known_agents = ("librarian", "developer", "reviewer", "connector", "writer", "archivist", "examiner", "plan", "build", "explore", "general", "vision")
-    if args and args[0] in known_agents:
-        agent = args.pop(0)
-
-    prompt = " ".join(args) if args else ""
+    prompt = text
+    first = text.split(maxsplit=1)
+    if first and first[0] in _KNOWN_AGENTS:
+        agent = first[0]
+        prompt = first[1] if len(first) > 1 else ""
 
     # If only an image with no text, set a default prompt
     if not prompt and images:
@@ -939,55 +1104,85 @@ async def opencode_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
 # ============================================
 
 
+# (exam.items_version(), normalized titles, normalized title -> item index)
+_title_index: tuple[int, list[str], dict[str, int]] | None = None
+
+
+def _normalize_title(title: str) -> str:
+    """Lowercase and collapse whitespace so "Deep  Work " hits the exact lookup."""
+    return " ".join(title.lower().split())
+
+
+def _get_title_index(items: list[dict]) -> int:
+    """Refresh the title index from *items* if the vault's titles changed; return its version."""
+    global _title_index
+    version = exam.items_version()
+    if _title_index is None or _title_index[0] != version:
+        titles_lower = [_normalize_title(item["title"]) for item in items]
+        by_title: dict[str, int] = {}
+        for idx, title in enumerate(titles_lower):
+            by_title.setdefault(title, idx)
+        _title_index = (version, titles_lower, by_title)
+        _match_title.cache_clear()
+    return version
+
+
+@lru_cache(maxsize=256)
+def _match_title(version: int, query_lower: str) -> tuple[int | None, tuple[int, ...]]:
+    """Match *query_lower* against the title index of *version*.
+
+    Returns (matched index, suggestion indices). Memoized, so retrying the
+    same query skips the scan until the titles change.
+    """
+    _, titles_lower, by_title = _title_index
+
+    # 1. Exact substring match (case-insensitive)
+    if (idx := by_title.get(query_lower)) is not None:
+        return idx, ()
+    for idx, title in enumerate(titles_lower):
+        if query_lower in title or title in query_lower:
+            return idx, ()
+
+    # 2. Fuzzy match (WRatio >= 60)
+    match = process.extractOne(query_lower, titles_lower, scorer=fuzz.WRatio, score_cutoff=60)
+    if match:
+        return match[2], ()
+
+    # 3. Word-level partial match for suggestions: one regex alternation scans
+    # each title for all query words at once
+    query_words = query_lower.split()
+    if not query_words:
+        return None, ()
+    words_re = re.compile("|".join(map(re.escape, query_words)))
+    suggestions = (idx for idx, title in enumerate(titles_lower) if words_re.search(title))
+    return None, tuple(islice(suggestions, 5))
+
+
 def _find_item_by_title(
     query: str, items: list[dict],
 ) -> tuple[dict | None, list[str]]:
     """Case-insensitive fuzzy search for a reviewable item by title.
 
+    *items* must be the list last returned by exam.get_reviewable_items().
+
     Returns (matched_item, suggestions).  If matched_item is not None,
     suggestions is empty.
     """
-    from difflib import SequenceMatcher
-
-    query_lower = query.lower().strip()
-
-    # 1. Exact substring match (case-insensitive)
-    for item in items:
-        if query_lower == item["title"].lower():
-            return item, []
-    for item in items:
-        if query_lower in item["title"].lower() or item["title"].lower() in query_lower:
-            return item, []
-
-    # 2. Fuzzy match (>0.6 ratio)
-    best_ratio = 0.0
-    best_item = None
-    for item in items:
-        ratio = SequenceMatcher(None, query_lower, item["title"].lower()).ratio()
-        if ratio > best_ratio:
-            best_ratio = ratio
-            best_item = item
-    if best_ratio > 0.6 and best_item:
-        return best_item, []
-
-    # 3. Word-level partial match for suggestions
-    query_words = query_lower.split()
-    titles = [i["title"] for i in items]
-    suggestions = [t for t in titles if any(w in t.lower() for w in query_words)]
-    return None, suggestions[:5]
+    version = _get_title_index(items)
+    idx, suggestion_idxs = _match_title(version, _normalize_title(query))
+    if idx is not None:
+        return items[idx], []
+    return None, [items[i]["title"] for i in suggestion_idxs]
 
 
 async def quiz_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /quiz command — quick quiz from vault content."""
-    if not await _check_auth(update):
-        return
-
     user_id = update.effective_user.id
     session = _get_session(user_id)
     args = list(ctx.args) if ctx.args else []
     _record_command(session, f"/quiz {' '.join(args)}".strip())
 
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
 
     # Check for --connect flag
     connect_mode = "--connect" in args or "-c" in args
@@ -1029,8 +1224,7 @@ async def quiz_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
         source_label = matched["title"]
     else:
         # Random quiz — prefer due items
-        due = exam.get_due_items()
-        target = due[0] if due else random.choice(items)
+        target = exam.get_next_due_item(items) or random.choice(items)
         questions = exam.generate_questions(
             target["content"], target["title"], target["type"],
         )
@@ -1045,11 +1239,7 @@ async def quiz_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     _quiz_sessions[user_id] = quiz
 
     q = quiz.current_question
-    type_icons = {
-        "recall": "🔄", "application": "🎯", "synthesis": "🧩",
-        "connection": "🔗", "contrast": "⚖️", "truefalse": "✅❌",
-    }
-    icon = type_icons.get(q.question_type, "❓")
+    icon = _TYPE_ICONS.get(q.question_type, "❓")
 
     await update.message.reply_text(
         f"🧪 *Quiz — {source_label}*\n"
@@ -1062,24 +1252,16 @@ async def quiz_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def exam_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /exam command — deep exam on a specific Encounter."""
-    if not await _check_auth(update):
-        return
-
     user_id = update.effective_user.id
     session = _get_session(user_id)
     args = list(ctx.args) if ctx.args else []
     _record_command(session, f"/exam {' '.join(args)}".strip())
 
     if not args:
-        await update.message.reply_text(
-            "🧪 *Examen profundo*\n\n"
-            "Uso: `/exam <título>` — Examen de 8 preguntas sobre un libro o nota\n\n"
-            "Ejemplo: `/exam The Systemic CTO`",
-            parse_mode="Markdown",
-        )
+        await update.message.reply_text(_HELP_EXAM, parse_mode="Markdown")
         return
 
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
 
     title_query = " ".join(args)
     items = exam.get_reviewable_items()
@@ -1108,11 +1290,7 @@ async def exam_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     _quiz_sessions[user_id] = quiz
 
     q = quiz.current_question
-    type_icons = {
-        "recall": "🔄", "application": "🎯", "synthesis": "🧩",
-        "connection": "🔗", "contrast": "⚖️", "truefalse": "✅❌",
-    }
-    icon = type_icons.get(q.question_type, "❓")
+    icon = _TYPE_ICONS.get(q.question_type, "❓")
 
     await update.message.reply_text(
         f"🧪 *Examen — {matched['title']}*\n"
@@ -1125,46 +1303,41 @@ async def exam_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def score_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /score command — retention dashboard."""
-    if not await _check_auth(update):
-        return
-
     session = _get_session(update.effective_user.id)
     _record_command(session, "/score")
 
     stats = exam.get_stats()
 
     parts = [
-        "📊 *Retention Dashboard*\n",
-        "━" * 24,
-        f"\n📚 Items rastreados: {stats['total_tracked']}",
-        f"📝 Total revisable: {stats['total_reviewable']}",
-        f"🆕 Sin revisar: {stats['never_reviewed']}",
-        f"✅ Revisados hoy: {stats['reviewed_today']}",
-        f"🔄 Pendientes de revisión: {stats['due_count']}",
-        f"📈 Retención promedio: {stats['avg_retention']}%",
+        "📊 *Retention Dashboard*\n\n"
+        f"{_SEP_24}\n\n"
+        f"📚 Items rastreados: {stats['total_tracked']}\n"
+        f"📝 Total revisable: {stats['total_reviewable']}\n"
+        f"🆕 Sin revisar: {stats['never_reviewed']}\n"
+        f"✅ Revisados hoy: {stats['reviewed_today']}\n"
+        f"🔄 Pendientes de revisión: {stats['due_count']}\n"
+        f"📈 Retención promedio: {stats['avg_retention']}%"
     ]
 
+    # Only the variable-length lists need per-item formatting
     if stats["strengths"]:
         parts.append("\n🏆 *Puntos fuertes* (ease alto)")
-        for s in stats["strengths"]:
-            parts.append(f"  • {s['title']} — ease: {s['ease']}")
+        parts.append("\n".join(f"  • {s['title']} — ease: {s['ease']}" for s in stats["strengths"]))
 
     if stats["needs_work"]:
         parts.append("\n⚠️ *Necesita repaso* (ease bajo)")
-        for s in stats["needs_work"]:
-            parts.append(f"  • {s['title']} — ease: {s['ease']}")
+        parts.append("\n".join(f"  • {s['title']} — ease: {s['ease']}" for s in stats["needs_work"]))
 
-    parts.append(f"\n📅 Mañana: {stats['upcoming_tomorrow']} revisiones")
-    parts.append(f"📅 Esta semana: {stats['upcoming_week']} revisiones")
+    parts.append(
+        f"\n📅 Mañana: {stats['upcoming_tomorrow']} revisiones\n"
+        f"📅 Esta semana: {stats['upcoming_week']} revisiones"
+    )
 
     await update.message.reply_text("\n".join(parts), parse_mode="Markdown")
 
 
 async def review_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /review command — show items due for review."""
-    if not await _check_auth(update):
-        return
-
     session = _get_session(update.effective_user.id)
     _record_command(session, "/review")
 
@@ -1181,13 +1354,15 @@ async def review_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
 
     parts = [f"🧪 *Items pendientes de revisión: {len(due)}*\n"]
 
-    for i, item in enumerate(due[:10], 1):
-        icon = "🗂️" if item["type"] == "card" else "📚"
-        new_badge = " 🆕" if item.get("never_reviewed") else ""
-        parts.append(f"{i}. {icon} {item['title']}{new_badge}")
+    parts.append("\n".join(
+        f"{i}. {_ITEM_ICONS.get(item['type'], '📚')} {item['title']}"
+        + (" 🆕" if item.get("never_reviewed") else "")
+        for i, item in enumerate(islice(due, 10), 1)
+    ))
 
-    if len(due) > 10:
-        parts.append(f"\n...y {len(due) - 10} más")
+    overflow = len(due) - 10
+    if overflow > 0:
+        parts.append(f"\n...y {overflow} más")
 
     parts.append("\n💡 Usa `/quiz` para empezar un quiz con el contenido pendiente.")
 
@@ -1196,9 +1371,6 @@ async def review_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None
 
 async def skip_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /skip command — skip current quiz question."""
-    if not await _check_auth(update):
-        return
-
     user_id = update.effective_user.id
     quiz = _quiz_sessions.get(user_id)
 
@@ -1285,33 +1457,20 @@ async def _send_next_question_or_finish(
             max_total = len(valid_scores) * 5
             pct = round(total / max_total * 100) if max_total else 0
 
-            table = ["", "| # | Tipo | Score | Estado |", "|---|------|-------|--------|"]
-            type_icons = {
-                "recall": "🔄", "application": "🎯", "synthesis": "🧩",
-                "connection": "🔗", "contrast": "⚖️", "truefalse": "✅❌",
-            }
-            for i, q in enumerate(quiz.questions):
-                s = quiz.scores[i] if i < len(quiz.scores) else -1
-                icon = type_icons.get(q.question_type, "❓")
-                if s < 0:
-                    status = "⏭️"
-                    score_str = "—"
-                elif s >= 4:
-                    status = "✅"
-                    score_str = f"{s}/5"
-                elif s >= 3:
-                    status = "🟡"
-                    score_str = f"{s}/5"
-                else:
-                    status = "❌"
-                    score_str = f"{s}/5"
-                table.append(f"| {i+1} | {icon} | {score_str} | {status} |")
+            scores = chain(quiz.scores, repeat(-1))
+            rows = "\n".join(
+                f"| {i} | {_TYPE_ICONS.get(q.question_type, '❓')} | "
+                + ("— | ⏭️ |" if s < 0 else f"{s}/5 | {_STATUS_LUT[int(s)]} |")
+                for i, (q, s) in enumerate(zip(quiz.questions, scores), 1)
+            )
 
             result_text = (
                 f"📊 *Resultado del quiz*\n"
-                f"📖 Fuente: {quiz.questions[0].source_title}\n"
-                + "\n".join(table)
-                + f"\n\n*Total: {total}/{max_total} ({pct}%)*"
+                f"📖 Fuente: {quiz.questions[0].source_title}\n\n"
+                "| # | Tipo | Score | Estado |\n"
+                "|---|------|-------|--------|\n"
+                f"{rows}"
+                f"\n\n*Total: {total}/{max_total} ({pct}%)*"
             )
         else:
             result_text = "📊 *Quiz completado* — todas las preguntas fueron saltadas."
@@ -1322,11 +1481,7 @@ async def _send_next_question_or_finish(
 
     # Next question
     q = quiz.current_question
-    type_icons = {
-        "recall": "🔄", "application": "🎯", "synthesis": "🧩",
-        "connection": "🔗", "contrast": "⚖️", "truefalse": "✅❌",
-    }
-    icon = type_icons.get(q.question_type, "❓")
+    icon = _TYPE_ICONS.get(q.question_type, "❓")
 
     await update.message.reply_text(
         f"Pregunta {quiz.current_index + 1}/{quiz.total}\n\n"
@@ -1339,29 +1494,54 @@ async def _send_next_question_or_finish(
 # --- Message Handlers ---
 
 
+async def _process_in_order(
+    update: Update, session: SessionContext, func, *args, **handle_kwargs,
+) -> None:
+    """Run an LLM call concurrently with other captures, but handle results in order.
+
+    Photo and voice handlers are non-blocking, so a dump of N photos runs up to
+    LLM_CONCURRENCY requests at once; vault writes and replies still follow the
+    order in which the captures reached this point. Arguments (including the
+    active book) are bound at submission, so pages sent in the same album as a
+    cover are prompted without the book that cover sets.
+    """
+    user_id = update.effective_user.id
+    prev = _result_tails.get(user_id)
+    turn = asyncio.get_running_loop().create_future()
+    _result_tails[user_id] = turn
+    try:
+        async with _llm_slots:
+            result = await asyncio.to_thread(func, *args)
+        if prev is not None:
+            # Shielded: cancelling this task must not cancel the shared future
+            await asyncio.shield(prev)
+        await _handle_llm_result(update, session, result, **handle_kwargs)
+    finally:
+        if not turn.done():
+            turn.set_result(None)
+        if _result_tails.get(user_id) is turn:
+            del _result_tails[user_id]
+
+
 async def photo_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
 
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
 
     photo = update.message.photo[-1]  # highest resolution
     file = await ctx.bot.get_file(photo.file_id)
-    image_data = await file.download_as_bytearray()
+    image_data = await _download_bytes(file)
 
     caption = update.message.caption
     _record_user_photo(session, f"[photo]{f': {caption}' if caption else ''}")
 
-    result = llm.process_photo(bytes(image_data), caption, session.active_book)
-
-    await _handle_llm_result(update, session, result, image_data=bytes(image_data))
+    await _process_in_order(
+        update, session, llm.process_photo, image_data, caption, session.active_book,
+        image_data=image_data,
+    )
 
 
 async def text_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
-
     # If the user has an active quiz, treat the message as a quiz answer
     user_id = update.effective_user.id
     if await _handle_quiz_answer(update, user_id):
@@ -1369,27 +1549,24 @@ async def text_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
     session = _get_session(user_id)
 
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
 
     _record_user_text(session, update.message.text)
 
-    result = llm.process_text(update.message.text, session.active_book)
-
-    await _handle_llm_result(update, session, result)
+    await _process_in_order(update, session, llm.process_text, update.message.text, session.active_book)
 
 
 async def voice_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
-    if not await _check_auth(update):
-        return
     session = _get_session(update.effective_user.id)
 
-    await ctx.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    _send_typing(update, ctx)
 
     voice = update.message.voice or update.message.audio
     file = await ctx.bot.get_file(voice.file_id)
-    voice_data = await file.download_as_bytearray()
+    voice_data = await _download_bytes(file)
 
-    transcript = llm.transcribe_audio(bytes(voice_data))
+    async with _llm_slots:
+        transcript = await asyncio.to_thread(llm.transcribe_audio, voice_data)
     if not transcript:
         await update.message.reply_text("❌ No pude transcribir el audio. Intenta de nuevo.")
         return
@@ -1398,9 +1575,9 @@ async def voice_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> None:
 
     await update.message.reply_text(f"🎤 Transcripción:\n_{transcript}_", parse_mode="Markdown")
 
-    result = llm.process_voice_transcript(transcript, session.active_book)
-
-    await _handle_llm_result(update, session, result)
+    await _process_in_order(
+        update, session, llm.process_voice_transcript, transcript, session.active_book,
+    )
 
 
 # --- Callback Handler ---
@@ -1411,15 +1588,12 @@ async def callback_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
     await query.answer()
 
     user_id = query.from_user.id
-    if not _is_authorized(user_id):
-        return
-
     session = _get_session(user_id)
     data = query.data
+    tag, payload = data[:1], data[1:]
 
-    if data.startswith("rate:"):
-        value = data.split(":")[1]
-        if value == "skip":
+    if tag in (_CB_RATE, _CB_RATE_SKIP):
+        if tag == _CB_RATE_SKIP:
             session.is_dump_session = False
             await query.edit_message_text(
                 f"📖 *{session.active_book}* — sigue en progreso.\n"
@@ -1427,23 +1601,28 @@ async def callback_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
                 parse_mode="Markdown",
             )
         else:
-            rating = int(value)
+            rating = int(payload)
             book_title = session.active_book
             
-            if book_title:
-                vault.update_encounter_status(book_title, status="done", rating=rating)
-            
             # Generate auto-summary if book is done
             summary_text = ""
             if book_title:
-                await query.message.reply_text(
-                    "📝 *Generando resumen automático...*",
-                    parse_mode="Markdown",
-                )
+                # Encounter writes stay on the loop (like the capture path's
+                # edit_encounter) so they can't interleave and overwrite each other
+                vault.update_encounter_status(book_title, status="done", rating=rating)
                 
-                bookmarks_content = vault.get_all_bookmarks(book_title)
+                # Read the bookmarks while the status message is in flight
+                _, bookmarks_content = await asyncio.gather(
+                    query.message.reply_text(
+                        "📝 *Generando resumen automático...*",
+                        parse_mode="Markdown",
+                    ),
+                    asyncio.to_thread(vault.get_all_bookmarks, book_title),
+                )
                 if bookmarks_content:
-                    summary_result = llm.generate_book_summary(book_title, bookmarks_content)
+                    summary_result = await asyncio.to_thread(
+                        llm.generate_book_summary, book_title, bookmarks_content,
+                    )
                     if summary_result:
                         vault.update_encounter_summary(
                             book_title,
@@ -1472,18 +1651,14 @@ async def callback_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
                 f"Usa /atomic para revisarlas."
             )
 
-    elif data.startswith("atomic:"):
-        parts = data.split(":")
-        action = parts[1]
-        idx = int(parts[2])
+    elif tag in (_CB_ATOMIC_YES, _CB_ATOMIC_NO):
+        proposal = session.pending_atomic.pop(int(payload, 16), None)
 
-        if idx >= len(session.pending_atomic):
+        if proposal is None:
             await query.edit_message_text("⚠️ Propuesta ya procesada.")
             return
 
-        proposal = session.pending_atomic[idx]
-
-        if action == "yes":
+        if tag == _CB_ATOMIC_YES:
             card_title = vault.create_atomic_note(
                 title=proposal.title,
                 idea=proposal.idea,
@@ -1524,6 +1699,38 @@ async def callback_handler(update: Update, ctx: ContextTypes.DEFAULT_TYPE) -> No
 # --- Core Processing ---
 
 
+def _utf16_len(text: str) -> int:
+    # Telegram measures message length in UTF-16 code units (emoji count as 2)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _pack_chunks(parts: list[str], limit: int = TELEGRAM_CHUNK_LIMIT) -> list[str]:
+    """Pack the lines of *parts* into newline-joined messages of at most *limit* units.
+
+    Splits on line boundaries so Markdown spans aren't cut mid-line; only a
+    single line longer than the limit is hard-split.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for part in parts:
+        for line in part.split("\n"):
+            n = _utf16_len(line)
+            if current and size + 1 + n > limit:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            if n > limit:
+                # Every char is at most 2 units, so limit // 2 chars always fit
+                step = limit // 2
+                chunks.extend(line[i : i + step] for i in range(0, len(line), step))
+                continue
+            size += n + (1 if current else 0)
+            current.append(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
 async def _handle_llm_result(
     update: Update,
     session: SessionContext,
@@ -1531,6 +1738,7 @@ async def _handle_llm_result(
     image_data: bytes | None = None,
 ) -> None:
     parts: list[str] = []
+    memory: str | None = None
 
     # Book detection
     if result.book_title and not session.active_book:
@@ -1570,35 +1778,35 @@ async def _handle_llm_result(
             table_lines = ["", "| # | Pág | Tipo | Contenido |", "|---|-----|------|-----------|"]
             saved = 0
 
-            for i, entry in enumerate(result.entries):
-                # Save attachment if photo
-                attachment_name = None
-                if image_data and i == 0:
-                    attachment_name = vault.save_attachment(
-                        image_data, session.active_book, entry.page
-                    )
+            rows: list[tuple[int, str, str, str]] = []
 
-                write_result = vault.append_entry(session.active_book, entry)
+            # Read the encounter once and write it once for the whole batch
+            with vault.edit_encounter(session.active_book) as encounter_lines:
+                for i, entry in enumerate(result.entries, 1):
+                    # Save attachment if photo
+                    attachment_name = None
+                    if image_data and i == 1:
+                        attachment_name = vault.save_attachment(
+                            image_data, session.active_book, entry.page
+                        )
 
-                page_str = f"p.{entry.page}" if entry.page else "p.??"
-                content_preview = entry.content[:50].replace("|", "\\|")
+                    write_result = vault.append_entry_lines(encounter_lines, entry)
 
-                if write_result.get("ok"):
-                    saved += 1
-                    table_lines.append(
-                        f"| {i + 1} | {page_str} | {entry.entry_type.icon} | {content_preview} |"
-                    )
-                elif write_result.get("duplicate"):
-                    table_lines.append(
-                        f"| {i + 1} | {page_str} | 🔄 | _(duplicado, omitido)_ |"
-                    )
-                else:
-                    error = write_result.get("error", "unknown")
-                    table_lines.append(
-                        f"| {i + 1} | {page_str} | ❌ | Error: {error} |"
-                    )
+                    page_str = f"p.{entry.page}" if entry.page else "p.??"
+
+                    if write_result.get("ok"):
+                        saved += 1
+                        preview = entry.content[:50].translate(_PIPE_TABLE)
+                        rows.append((i, page_str, entry.entry_type.icon, preview))
+                    elif write_result.get("duplicate"):
+                        rows.append((i, page_str, "🔄", "_(duplicado, omitido)_"))
+                    else:
+                        rows.append((i, page_str, "❌", f"Error: {write_result.get('error', 'unknown')}"))
+
+            table_lines.extend("| %d | %s | %s | %s |" % row for row in rows)
 
             session.entries_this_session += saved
+            memory = f"{saved} entries saved to '{session.active_book}'"
             parts.append(f"📖 *{session.active_book}* — {saved} entries añadidas")
             parts.append("\n".join(table_lines))
 
@@ -1613,7 +1821,7 @@ async def _handle_llm_result(
 
     # Atomic proposals
     if result.atomic_proposals:
-        session.pending_atomic.extend(result.atomic_proposals)
+        session.add_pending_atomic(result.atomic_proposals)
         for proposal in result.atomic_proposals:
             mocs = ", ".join(proposal.related_mocs) if proposal.related_mocs else "—"
             parts.append(
@@ -1628,14 +1836,9 @@ async def _handle_llm_result(
 
     # Send response
     if parts:
-        response = "\n".join(parts)
-        # Telegram message limit is 4096 chars
-        if len(response) > 4000:
-            for chunk_start in range(0, len(response), 4000):
-                chunk = response[chunk_start : chunk_start + 4000]
-                await update.message.reply_text(chunk, parse_mode="Markdown")
-        else:
-            await update.message.reply_text(response, parse_mode="Markdown")
-        _record_bot_reply(session, response)
+        # Chunks are sent one after another so they can't arrive out of order
+        for chunk in _pack_chunks(parts):
+            await update.message.reply_text(chunk, parse_mode="Markdown")
+        _record_bot_reply(session, "\n".join(parts), memory=memory)
     else:
         await update.message.reply_text("🤔 No pude extraer contenido. ¿Puedes intentar de nuevo?")
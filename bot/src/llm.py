@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import atexit
 import io
-import json
 import base64
+import heapq
 import logging
+from functools import lru_cache
+from typing import Callable
 
+import httpx
 from openai import OpenAI
 from groq import Groq
 
@@ -16,19 +20,81 @@ from src.models import (
     LLMResult,
 )
 from src import vault
+from src.llm_cache import ExactCache
 
 logger = logging.getLogger(__name__)
 
+try:
+    from pybase64 import b64encode_as_string as _b64encode_str
+except ImportError:  # stdlib fallback
+    def _b64encode_str(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
 
-def _create_client() -> OpenAI | Groq:
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+try:
+    from PIL import Image, ImageOps
+
+    _HAS_PIL = True
+except ImportError:
+    Image = ImageOps = None  # type: ignore[assignment]
+    _HAS_PIL = False
+
+# Re-encode quality for downscaled photos
+IMAGE_JPEG_QUALITY = 85
+
+# Repeated text/voice captures (same words, same vault state) reuse the previous response
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 3600.0  # seconds
+
+_response_cache = ExactCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Deterministic helpers (book summaries, MOC suggestions) reuse identical requests
+EXACT_CACHE_SIZE = 512
+EXACT_CACHE_TTL = 24 * 3600.0  # seconds
+
+_exact_cache = ExactCache(EXACT_CACHE_SIZE, EXACT_CACHE_TTL)
+
+
+def cache_stats() -> dict[str, tuple[int, int, int]]:
+    """(hits, misses, entries) for each response cache."""
+    return {
+        name: (cache.hits, cache.misses, len(cache))
+        for name, cache in (("capture", _response_cache), ("exact", _exact_cache))
+    }
+
+
+# Shared keep-alive pool for the SDK clients; HTTP/2 multiplexes concurrent dump calls
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Transient failures (429, 5xx, timeouts, dropped connections) are retried by the
+# SDK with exponential backoff + jitter, honouring retry-after headers
+LLM_MAX_RETRIES = 4
+
+
+@lru_cache(maxsize=None)
+def _client_for(provider: LLMProvider, api_key: str) -> OpenAI | Groq:
+    """One SDK client per (provider, key), so its HTTP connection pool is reused."""
+    http_client = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    sdk = Groq if provider == LLMProvider.GROQ else OpenAI
+    client = sdk(api_key=api_key, http_client=http_client, max_retries=LLM_MAX_RETRIES)
+    atexit.register(client.close)
+    return client
+
+
+def _get_client() -> OpenAI | Groq:
     if settings.llm_provider == LLMProvider.GROQ:
-        return Groq(api_key=settings.groq_api_key)
-    return OpenAI(api_key=settings.openai_api_key)
+        return _client_for(LLMProvider.GROQ, settings.groq_api_key)
+    return _client_for(LLMProvider.OPENAI, settings.openai_api_key)
 
 
-def _create_transcription_client() -> OpenAI | Groq:
+def _get_transcription_client() -> OpenAI | Groq:
     """Transcription client — uses the same provider as the main LLM."""
-    return _create_client()
+    return _get_client()
 
 
 SYSTEM_PROMPT = """You are the Librarian, a reading assistant for an Obsidian Second Brain vault.
@@ -91,31 +157,99 @@ RESPONSE JSON SCHEMA:
 }
 """
 
+# System turns are shared by reference and never mutated, so every request of a
+# kind starts with the same bytes (stable prefix for provider prompt caching)
+_SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def _mtime(path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def _context_snapshot(book_title: str | None) -> tuple:
+    """Cheap stat-based fingerprint of everything _build_context reads.
+
+    Directory mtimes change when notes are created or removed; the encounter's
+    own mtime and vault.generation() catch edits to existing notes.
+    """
+    paths = [settings.encounters_path, settings.cards_path, settings.vault_path / "Atlas"]
+    if book_title:
+        paths.append(settings.encounters_path / f"{book_title}.md")
+    return (vault.generation(), *map(_mtime, paths))
+
 
 def _build_context(book_title: str | None) -> str:
+    return _render_context(book_title, _context_snapshot(book_title))
+
+
+@lru_cache(maxsize=64)
+def _render_context(book_title: str | None, snapshot: tuple) -> str:
+    """Render the vault context; *snapshot* only keys the cache.
+
+    Lists are sorted and the vault-wide blocks come before the book-specific
+    note, so consecutive prompts share the longest possible prefix and the
+    provider's prompt cache can reuse it.
+    """
     parts: list[str] = []
 
-    existing_encounters = vault.list_encounters()
+    # nsmallest == sorted()[:n] without sorting (or copying) the whole vault listing
+    existing_encounters = heapq.nsmallest(20, vault.list_encounters(), key=str.casefold)
     if existing_encounters:
-        parts.append(f"Existing books in vault: {', '.join(existing_encounters[:20])}")
+        parts.append(f"Existing books in vault: {', '.join(existing_encounters)}")
+
+    existing_cards = heapq.nsmallest(30, vault.list_cards(), key=str.casefold)
+    if existing_cards:
+        parts.append(f"Existing atomic notes: {', '.join(existing_cards)}")
+
+    mocs = sorted(vault.list_mocs(), key=str.casefold)
+    if mocs:
+        parts.append(f"Available MOCs: {', '.join(mocs)}")
 
     if book_title:
         content = vault.read_encounter(book_title)
         if content and len(content) < 4000:
             parts.append(f"Current encounter note for '{book_title}':\n{content}")
         elif content:
-            lines = content.split("\n")[:60]
+            lines = content.split("\n", 60)[:60]
             parts.append("Current encounter note (truncated):\n" + "\n".join(lines))
 
-    existing_cards = vault.list_cards()
-    if existing_cards:
-        parts.append(f"Existing atomic notes: {', '.join(existing_cards[:30])}")
+    return "\n\n".join(parts)
 
-    mocs = vault.list_mocs()
-    if mocs:
-        parts.append(f"Available MOCs: {', '.join(mocs)}")
 
-    return "\n\n".join(parts)
+def _context_parts(active_book: str | None) -> list[str]:
+    """Opening user-message parts. The vault context goes before anything
+    per-message (active book, caption, text) so prompts share a stable prefix."""
+    context = _build_context(active_book)
+    return [f"--- VAULT CONTEXT ---\n{context}\n--- END CONTEXT ---\n"] if context else []
+
+
+def _downscale_image(image_data: bytes) -> bytes:
+    """Shrink a photo to settings.image_max_edge px and re-encode it as JPEG.
+
+    Vision models resize large images internally anyway, so sending the phone
+    original only costs upload time and input tokens. Returns *image_data*
+    unchanged if it is already small enough, Pillow is missing or decoding fails.
+    """
+    max_edge = settings.image_max_edge
+    if not _HAS_PIL or max_edge <= 0:
+        return image_data
+    try:
+        with Image.open(io.BytesIO(image_data)) as img:
+            if max(img.size) <= max_edge:
+                return image_data
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    except Exception:
+        logger.warning("Image downscale failed, sending original", exc_info=True)
+        return image_data
+    return buf.getvalue()
 
 
 def process_photo(
@@ -123,22 +257,19 @@ def process_photo(
     caption: str | None = None,
     active_book: str | None = None,
 ) -> LLMResult:
-    b64 = base64.b64encode(image_data).decode("utf-8")
-    context = _build_context(active_book)
+    b64 = _b64encode_str(_downscale_image(image_data))
 
-    user_parts: list[str] = []
+    user_parts = _context_parts(active_book)
     if active_book:
         user_parts.append(f"Active book: {active_book}")
     if caption:
         user_parts.append(f"User's note: {caption}")
     user_parts.append("Process this image. Extract all relevant content.")
-    if context:
-        user_parts.append(f"\n--- VAULT CONTEXT ---\n{context}")
 
     user_text = "\n".join(user_parts)
 
     messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+        _SYSTEM_MSG,
         {
             "role": "user",
             "content": [
@@ -154,13 +285,43 @@ def process_photo(
     return _call_llm(messages, active_book)
 
 
+def _cached_call(
+    kind: str,
+    text: str,
+    active_book: str | None,
+    build_messages: Callable[[str, str | None], list[dict]],
+) -> LLMResult:
+    """Serve the cached response for an identical capture, else call the LLM and cache it.
+
+    Only whitespace is normalized: any other difference (wording, page number)
+    is a new capture. The key includes the vault context snapshot, so a hit
+    also means the prompt's vault context is unchanged.
+    """
+    key = ExactCache.key_of({
+        "kind": kind,
+        "active_book": active_book,
+        "snapshot": _context_snapshot(active_book),
+        "text": " ".join(text.split()),
+    })
+    if (raw := _response_cache.get(key)) is not None:
+        logger.info("Response cache hit (%s)", kind)
+        return _parse_result(raw, active_book)
+
+    result = _call_llm(build_messages(text, active_book), active_book)
+    if result.raw_response:
+        _response_cache.put(key, result.raw_response)
+    return result
+
+
 def process_text(
     text: str,
     active_book: str | None = None,
 ) -> LLMResult:
-    context = _build_context(active_book)
+    return _cached_call("text", text, active_book, _text_messages)
 
-    user_parts: list[str] = []
+
+def _text_messages(text: str, active_book: str | None) -> list[dict]:
+    user_parts = _context_parts(active_book)
     if active_book:
         user_parts.append(f"Active book: {active_book}")
     user_parts.append(f"User message: {text}")
@@ -168,24 +329,22 @@ def process_text(
         "Classify and process this text. "
         "If it's a quote, idea, reflection, or question, handle accordingly."
     )
-    if context:
-        user_parts.append(f"\n--- VAULT CONTEXT ---\n{context}")
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+    return [
+        _SYSTEM_MSG,
         {"role": "user", "content": "\n".join(user_parts)},
     ]
 
-    return _call_llm(messages, active_book)
-
 
 def process_voice_transcript(
     transcript: str,
     active_book: str | None = None,
 ) -> LLMResult:
-    context = _build_context(active_book)
+    return _cached_call("voice", transcript, active_book, _voice_messages)
 
-    user_parts: list[str] = []
+
+def _voice_messages(transcript: str, active_book: str | None) -> list[dict]:
+    user_parts = _context_parts(active_book)
     if active_book:
         user_parts.append(f"Active book: {active_book}")
     user_parts.append(f"Voice transcript: {transcript}")
@@ -193,20 +352,16 @@ def process_voice_transcript(
         "This is a voice message transcript. It may contain dictation errors. "
         "Interpret the intent and process accordingly."
     )
-    if context:
-        user_parts.append(f"\n--- VAULT CONTEXT ---\n{context}")
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+    return [
+        _SYSTEM_MSG,
         {"role": "user", "content": "\n".join(user_parts)},
     ]
 
-    return _call_llm(messages, active_book)
-
 
 def transcribe_audio(audio_data: bytes) -> str | None:
     try:
-        client = _create_transcription_client()
+        client = _get_transcription_client()
         audio_file = io.BytesIO(audio_data)
         audio_file.name = "voice.ogg"
         response = client.audio.transcriptions.create(
@@ -222,7 +377,7 @@ def transcribe_audio(audio_data: bytes) -> str | None:
 
 def _call_llm(messages: list[dict], active_book: str | None) -> LLMResult:
     try:
-        client = _create_client()
+        client = _get_client()
 
         kwargs: dict = {
             "model": settings.active_model,
@@ -239,7 +394,18 @@ def _call_llm(messages: list[dict], active_book: str | None) -> LLMResult:
         response = client.chat.completions.create(**kwargs)
 
         raw = response.choices[0].message.content or "{}"
-        data = json.loads(raw)
+        return _parse_result(raw, active_book)
+
+    except Exception:
+        logger.exception("LLM call failed")
+        return LLMResult(
+            questions=["❌ Error processing with LLM. Please try again."]
+        )
+
+
+def _parse_result(raw: str, active_book: str | None) -> LLMResult:
+    try:
+        data = _json_loads(raw)
 
         entries: list[ExtractedEntry] = []
         for e in data.get("entries", []):
@@ -281,12 +447,30 @@ def _call_llm(messages: list[dict], active_book: str | None) -> LLMResult:
         )
 
     except Exception:
-        logger.exception("LLM call failed")
+        logger.exception("Failed to parse LLM response")
         return LLMResult(
             questions=["❌ Error processing with LLM. Please try again."]
         )
 
 
+def _cached_completion(messages: list[dict], temperature: float, **kwargs) -> str | None:
+    """Chat completion content, served from the exact-match cache when possible.
+
+    Identical requests issued concurrently share one upstream call.
+    """
+    def complete() -> str | None:
+        response = _get_client().chat.completions.create(
+            model=settings.active_model,
+            messages=messages,
+            temperature=temperature,
+            **kwargs,
+        )
+        return response.choices[0].message.content
+
+    key = ExactCache.key(settings.active_model, messages, temperature, **kwargs)
+    return _exact_cache.get_or_compute(key, complete)
+
+
 # ============================================
 # BOOK SUMMARY GENERATION
 # ============================================
@@ -307,6 +491,16 @@ RESPONSE JSON SCHEMA:
 }
 """
 
+_SUMMARY_SYSTEM_MSG = {"role": "system", "content": SUMMARY_SYSTEM_PROMPT}
+
+_MOC_SYSTEM_MSG = {
+    "role": "system",
+    "content": (
+        "Eres un asistente que sugiere conexiones entre notas. Dado el título y contenido "
+        "de una nota, sugiere qué MOCs (Maps of Content) son relevantes."
+    ),
+}
+
 
 def generate_book_summary(book_title: str, bookmarks_content: str) -> dict | None:
     """
@@ -328,7 +522,7 @@ def generate_book_summary(book_title: str, bookmarks_content: str) -> dict | Non
         bookmarks_content = bookmarks_content[:8000] + "..."
     
     messages = [
-        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        _SUMMARY_SYSTEM_MSG,
         {
             "role": "user",
             "content": f"Título del libro: {book_title}\n\nBOOKMARKS CAPTURADOS:\n{bookmarks_content}",
@@ -336,24 +530,13 @@ def generate_book_summary(book_title: str, bookmarks_content: str) -> dict | Non
     ]
     
     try:
-        client = _create_client()
-        
-        kwargs: dict = {
-            "model": settings.active_model,
-            "messages": messages,
-            "max_tokens": 1024,
-            "temperature": 0.5,
-        }
-        
-        if settings.llm_provider == LLMProvider.OPENAI:
-            kwargs["response_format"] = {"type": "json_object"}
-        else:
-            kwargs["response_format"] = {"type": "json_object"}
-        
-        response = client.chat.completions.create(**kwargs)
-        
-        raw = response.choices[0].message.content or "{}"
-        data = json.loads(raw)
+        raw = _cached_completion(
+            messages,
+            max_tokens=1024,
+            temperature=0.5,
+            response_format={"type": "json_object"},
+        ) or "{}"
+        data = _json_loads(raw)
         
         return {
             "summary": data.get("summary", ""),
@@ -383,10 +566,7 @@ def suggest_moc_connections_llm(card_title: str, card_content: str, available_mo
     mocs_list = ", ".join(available_mocs)
     
     messages = [
-        {
-            "role": "system",
-            "content": f"Eres un asistente que sugiere conexiones entre notas. Dado el título y contenido de una nota, sugiere qué MOCs (Maps of Content) son relevantes.",
-        },
+        _MOC_SYSTEM_MSG,
         {
             "role": "user",
             "content": f"Título de la nota: {card_title}\n\nContenido:\n{card_content[:500]}\n\nMOCs disponibles: {mocs_list}\n\nResponde solo con una lista de MOCs separados por comas (ej: Productivity, Leadership). Si ninguno es relevante, responde con 'NONE'.",
@@ -394,16 +574,7 @@ def suggest_moc_connections_llm(card_title: str, card_content: str, available_mo
     ]
     
     try:
-        client = _create_client()
-        
-        response = client.chat.completions.create(
-            model=settings.active_model,
-            messages=messages,
-            max_tokens=100,
-            temperature=0.3,
-        )
-        
-        result = response.choices[0].message.content or ""
+        result = _cached_completion(messages, max_tokens=100, temperature=0.3) or ""
         
         if result.strip().upper() == "NONE":
             return []
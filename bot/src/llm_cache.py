@@ -0,0 +1,126 @@
+"""Response cache for LLM calls.
+
+ExactCache serves a previous raw response for a byte-identical request
+(model, messages, temperature), keyed by its SHA-256. Concurrent misses on
+the same key share a single upstream call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+
+    def _canonical_json(payload: dict) -> bytes:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _canonical_json(payload: dict) -> bytes:
+        return json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+
+class ExactCache:
+    """Bounded, TTL'd sha256(request) -> raw response store.
+
+    Thread-safe: the LLM helpers run in worker threads.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (raw response, stored_at); least recently used first
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        # key -> set once the thread computing it has finished
+        self._inflight: dict[str, threading.Event] = {}
+
+    @staticmethod
+    def key(model: str, messages: list[dict], temperature: float, **params) -> str:
+        """Key of a chat request; *params* are the other request options (max_tokens, ...)."""
+        return ExactCache.key_of(
+            {"model": model, "messages": messages, "temperature": temperature, "params": params}
+        )
+
+    @staticmethod
+    def key_of(payload: dict) -> str:
+        """SHA-256 of *payload* as canonical (sorted-key) JSON."""
+        return hashlib.sha256(_canonical_json(payload)).hexdigest()
+
+    def _lookup(self, key: str, count: bool = True) -> str | None:
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            self._entries.pop(key, None)
+            if count:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if count:
+            self._count_hit()
+        return entry[0]
+
+    def _count_hit(self) -> None:
+        # Caller holds self._lock
+        self.hits += 1
+        logger.info("Exact cache hit (%d/%d)", self.hits, self.hits + self.misses)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            return self._lookup(key)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str | None]) -> str | None:
+        """Cached value for *key*, else ``compute()`` — run by one thread at a time.
+
+        Threads that miss while another is computing the same key wait for it
+        and then re-check the cache; if that computation failed, one of them
+        takes over.
+        """
+        # Counted once per call: a hit if served from the cache (even after
+        # waiting on another thread), a miss if this call computes it
+        while True:
+            with self._lock:
+                raw = self._lookup(key, count=False)
+                if raw is not None:
+                    self._count_hit()
+                    return raw
+                pending = self._inflight.get(key)
+                if pending is None:
+                    self.misses += 1
+                    done = self._inflight[key] = threading.Event()
+            if pending is None:
+                break
+            pending.wait()
+
+        try:
+            raw = compute()
+            if raw:
+                self.put(key, raw)
+            return raw
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            done.set()
+
+    def put(self, key: str, raw: str) -> None:
+        with self._lock:
+            self._entries[key] = (raw, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
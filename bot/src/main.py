@@ -1,14 +1,18 @@
 import logging
+import re
 
 from telegram import Update
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
+    TypeHandler,
     filters,
 )
 
+from src import opencode, openlibrary
 from src.config import settings
 from src.handlers import (
     start_handler,
@@ -30,14 +34,18 @@ from src.handlers import (
     find_handler,
     reindex_handler,
     jobs_handler,
+    cachestats_handler,
     chain_handler,
     quiz_handler,
     exam_handler,
     score_handler,
     review_handler,
     skip_handler,
+    session_gc_job,
+    auth_middleware,
 )
 from src.scheduler import register_scheduled_jobs
+from src.models import SESSION_GC_INTERVAL
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -45,9 +53,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Photo captions routed to the OpenCode handler
+_OC_CAPTION = re.compile(r"^/(oc|opencode)\b")
+
+
+async def _close_http_clients(app: Application) -> None:
+    await openlibrary.close()
+    await opencode.close()
+
 
 def main() -> None:
-    app = ApplicationBuilder().token(settings.telegram_bot_token).build()
+    app = (
+        ApplicationBuilder()
+        .token(settings.telegram_bot_token)
+        .post_shutdown(_close_http_clients)
+        .build()
+    )
+
+    # Authorization runs once per update, before every other handler group
+    app.add_handler(TypeHandler(Update, auth_middleware), group=-1)
 
     # Command handlers
     app.add_handler(CommandHandler("start", start_handler))
@@ -68,6 +92,7 @@ def main() -> None:
     app.add_handler(CommandHandler("find", find_handler))
     app.add_handler(CommandHandler("reindex", reindex_handler))
     app.add_handler(CommandHandler("jobs", jobs_handler))
+    app.add_handler(CommandHandler("cachestats", cachestats_handler))
     app.add_handler(CommandHandler("chain", chain_handler))
 
     # Exam / Quiz commands
@@ -82,13 +107,14 @@ def main() -> None:
 
     # Photos with /oc or /opencode caption → opencode handler (before generic photo)
     app.add_handler(MessageHandler(
-        filters.PHOTO & filters.CaptionRegex(r"^/(oc|opencode)\b"),
+        filters.PHOTO & filters.CaptionRegex(_OC_CAPTION),
         opencode_handler,
     ))
 
-    # Message handlers
-    app.add_handler(MessageHandler(filters.PHOTO, photo_handler))
-    app.add_handler(MessageHandler(filters.VOICE | filters.AUDIO, voice_handler))
+    # Message handlers — photos/audios don't block the update queue, so a dump's
+    # LLM calls run concurrently (results are still handled in arrival order)
+    app.add_handler(MessageHandler(filters.PHOTO, photo_handler, block=False))
+    app.add_handler(MessageHandler(filters.VOICE | filters.AUDIO, voice_handler, block=False))
     app.add_handler(
         MessageHandler(filters.TEXT & ~filters.COMMAND, text_handler)
     )
@@ -96,6 +122,11 @@ def main() -> None:
     # Scheduled agent jobs
     register_scheduled_jobs(app)
 
+    # Periodic sweep of stale conversation memory
+    app.job_queue.run_repeating(
+        session_gc_job, interval=SESSION_GC_INTERVAL, first=SESSION_GC_INTERVAL, name="session_gc",
+    )
+
     logger.info("🧠 Librarian bot starting...")
     app.run_polling(allowed_updates=Update.ALL_TYPES)
 
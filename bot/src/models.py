@@ -4,6 +4,7 @@ from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import Callable
 
 
 class EntryType(str, Enum):
@@ -17,27 +18,32 @@ class EntryType(str, Enum):
 
     @property
     def icon(self) -> str:
-        return {
-            "idea": "💡",
-            "quote": "💬",
-            "problem_solution": "🔧",
-            "chapter_summary": "📖",
-            "key_takeaway": "🔑",
-            "thought": "💭",
-            "action_item": "✅",
-        }[self.value]
+        return _ENTRY_ICONS[self]
 
     @property
     def section_heading(self) -> str:
-        return {
-            "idea": "### 💡 Ideas & Concepts",
-            "quote": "### 💬 Quotes & Phrases",
-            "problem_solution": "### 🔧 Problems & Solutions",
-            "chapter_summary": "### 📖 Chapter Summaries",
-            "key_takeaway": "### 🔑 Key Takeaways",
-            "thought": "## My Thoughts",
-            "action_item": "## Action Items",
-        }[self.value]
+        return _ENTRY_HEADINGS[self]
+
+
+_ENTRY_ICONS: dict[EntryType, str] = {
+    EntryType.IDEA: "💡",
+    EntryType.QUOTE: "💬",
+    EntryType.PROBLEM_SOLUTION: "🔧",
+    EntryType.CHAPTER_SUMMARY: "📖",
+    EntryType.KEY_TAKEAWAY: "🔑",
+    EntryType.THOUGHT: "💭",
+    EntryType.ACTION_ITEM: "✅",
+}
+
+_ENTRY_HEADINGS: dict[EntryType, str] = {
+    EntryType.IDEA: "### 💡 Ideas & Concepts",
+    EntryType.QUOTE: "### 💬 Quotes & Phrases",
+    EntryType.PROBLEM_SOLUTION: "### 🔧 Problems & Solutions",
+    EntryType.CHAPTER_SUMMARY: "### 📖 Chapter Summaries",
+    EntryType.KEY_TAKEAWAY: "### 🔑 Key Takeaways",
+    EntryType.THOUGHT: "## My Thoughts",
+    EntryType.ACTION_ITEM: "## Action Items",
+}
 
 
 class SourceType(str, Enum):
@@ -49,7 +55,7 @@ class SourceType(str, Enum):
     TALK = "talk"
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractedEntry:
     entry_type: EntryType
     content: str
@@ -59,32 +65,28 @@ class ExtractedEntry:
     confidence: float = 1.0
     needs_clarification: str | None = None
 
-    def to_markdown(self) -> str:
-        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+    def to_markdown(self, timestamp: str | None = None) -> str:
+        """Render the entry; pass *timestamp* to stamp a batch of entries alike."""
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
         page_ref = f"p.{self.page}" if self.page else "p.??"
-        lines: list[str] = []
-
-        if self.entry_type == EntryType.QUOTE:
-            lines.append(f'> "{self.content}"')
-            lines.append(f"> — {page_ref}")
-        elif self.entry_type == EntryType.PROBLEM_SOLUTION:
-            lines.append(f"- **{page_ref}** — {self.content}")
-        elif self.entry_type == EntryType.CHAPTER_SUMMARY:
-            chapter_label = self.chapter or "?"
-            lines.append(f"#### {chapter_label}")
-            lines.append(f"- {self.content}")
-        elif self.entry_type == EntryType.THOUGHT:
-            lines.append(f"- {self.content}")
-        elif self.entry_type == EntryType.ACTION_ITEM:
-            lines.append(f"- [ ] {self.content}")
-        else:
-            lines.append(f"- **{page_ref}** — {self.content}")
-
-        lines.append(f"<!-- capture:{timestamp} -->")
-        return "\n".join(lines)
-
-
-@dataclass
+        render = _ENTRY_RENDERERS.get(self.entry_type, _render_default)
+        return f"{render(self, page_ref)}\n<!-- capture:{timestamp} -->"
+
+
+def _render_default(e: ExtractedEntry, page_ref: str) -> str:
+    return f"- **{page_ref}** — {e.content}"
+
+
+_ENTRY_RENDERERS: dict[EntryType, Callable[[ExtractedEntry, str], str]] = {
+    EntryType.QUOTE: lambda e, p: f'> "{e.content}"\n> — {p}',
+    EntryType.CHAPTER_SUMMARY: lambda e, p: f"#### {e.chapter or '?'}\n- {e.content}",
+    EntryType.THOUGHT: lambda e, p: f"- {e.content}",
+    EntryType.ACTION_ITEM: lambda e, p: f"- [ ] {e.content}",
+}
+
+
+@dataclass(slots=True)
 class AtomicNoteProposal:
     title: str
     idea: str
@@ -95,7 +97,7 @@ class AtomicNoteProposal:
     related_cards: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMResult:
     entries: list[ExtractedEntry] = field(default_factory=list)
     book_title: str | None = None
@@ -119,35 +121,48 @@ class TurnKind(str, Enum):
     RESULT = "result"
 
 
-@dataclass
+@dataclass(slots=True)
 class HistoryTurn:
     ts: datetime
     role: TurnRole
     kind: TurnKind
     text: str
     book: str | None = None
+    memory: str | None = None  # one-line fact for the conversation summary
 
 
-MAX_TURNS = 200
 MAX_TURN_CHARS = 800
 MAX_CONTEXT_CHARS = 6000
 CONTEXT_TTL = timedelta(hours=3)
 KEEP_LAST_TURNS = 30
+MAX_TURNS = KEEP_LAST_TURNS * 2
+MAX_ARCHIVED_FACTS = 50
+SUMMARY_BUDGET = 1500
+SESSION_GC_INTERVAL = 60  # seconds between stale-memory sweeps
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationMemory:
     turns: deque[HistoryTurn] = field(default_factory=lambda: deque(maxlen=MAX_TURNS))
-    summary: str = ""
+    # Evicted turns that carried a memory fact, so the summary survives eviction
+    archived: deque[HistoryTurn] = field(default_factory=lambda: deque(maxlen=MAX_ARCHIVED_FACTS))
     last_activity: datetime | None = None
+    total_chars: int = 0  # sum of len(turn.text) over turns
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionContext:
     active_book: str | None = None
     active_author: str | None = None
     is_dump_session: bool = False
     pending_retries: list[str] = field(default_factory=list)
-    pending_atomic: list[AtomicNoteProposal] = field(default_factory=list)
+    # Stable id -> proposal; ids go into callback_data and are never reused
+    pending_atomic: dict[int, AtomicNoteProposal] = field(default_factory=dict)
+    next_atomic_id: int = 0
     entries_this_session: int = 0
     memory: ConversationMemory = field(default_factory=ConversationMemory)
+
+    def add_pending_atomic(self, proposals: list[AtomicNoteProposal]) -> None:
+        for proposal in proposals:
+            self.pending_atomic[self.next_atomic_id] = proposal
+            self.next_atomic_id += 1
@@ -12,7 +12,7 @@ import json
 import logging
 import os
 import pathlib
-import subprocess
+import tempfile
 import time
 from typing import Any
 
@@ -22,11 +22,33 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+try:
+    from pybase64 import b64encode_as_string as _b64encode_str
+except ImportError:  # stdlib fallback
+    def _b64encode_str(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
+
 # OpenCode server configuration
 OPENCODE_HOST = "127.0.0.1"
 OPENCODE_PORT = 4096
 OPENCODE_BASE_URL = f"http://{OPENCODE_HOST}:{OPENCODE_PORT}"
 
+# Server stderr goes to a file: an undrained pipe would block the server once full
+OPENCODE_LOG_PATH = pathlib.Path(tempfile.gettempdir()) / "opencode-serve.log"
+
 # Default model (text only)
 OPENCODE_PROVIDER_ID = "zai-coding-plan"
 OPENCODE_MODEL_ID = "glm-4.7"
@@ -35,9 +57,38 @@ OPENCODE_MODEL_ID = "glm-4.7"
 OPENCODE_VISION_PROVIDER_ID = "groq"
 OPENCODE_VISION_MODEL_ID = "meta-llama/llama-4-scout-17b-16e-instruct"
 
+# Above this many images, vision extraction runs per group of this size in parallel
+VISION_GROUP_SIZE = 2
+
+_DEFAULT_MODEL = {"providerID": OPENCODE_PROVIDER_ID, "modelID": OPENCODE_MODEL_ID}
+_VISION_MODEL = {"providerID": OPENCODE_VISION_PROVIDER_ID, "modelID": OPENCODE_VISION_MODEL_ID}
+
+# Only the user's context varies between vision prompts
+_VISION_PROMPT_PREFIX = (
+    "Analyze the attached image(s) and extract ALL visible information:\n"
+    "- If it's a book cover: title, author, subtitle, publisher\n"
+    "- If it's a book page: page number, all readable text, highlights/underlines\n"
+    "- If it's handwritten notes: transcribe everything\n"
+    "- If it's a screenshot: describe and extract text\n"
+    "Mark anything illegible with [illegible]. Do NOT invent text.\n"
+    "Return ONLY the extracted information, no commentary.\n"
+    "\nUser's context: "
+)
+
+
+# Fingerprint of the env keys auth.json was last synced with
+_auth_fingerprint: int | None = None
+
 
 def _ensure_auth() -> None:
     """Write auth.json with available API keys so OpenCode can use them."""
+    global _auth_fingerprint
+    zhipu_key = os.environ.get("ZHIPU_API_KEY", "")
+    anthropic_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    fingerprint = hash((zhipu_key, anthropic_key))
+    if fingerprint == _auth_fingerprint:
+        return
+
     auth_dir = pathlib.Path.home() / ".local" / "share" / "opencode"
     auth_dir.mkdir(parents=True, exist_ok=True)
     auth_file = auth_dir / "auth.json"
@@ -46,17 +97,15 @@ def _ensure_auth() -> None:
     auth_data: dict[str, Any] = {}
     if auth_file.exists():
         try:
-            auth_data = json.loads(auth_file.read_text())
-        except (json.JSONDecodeError, OSError):
+            auth_data = _json_loads(auth_file.read_bytes())
+        except (ValueError, OSError):
             pass
 
     changed = False
-    zhipu_key = os.environ.get("ZHIPU_API_KEY", "")
     if zhipu_key and auth_data.get("zai-coding-plan", {}).get("apiKey") != zhipu_key:
         auth_data["zai-coding-plan"] = {"apiKey": zhipu_key}
         changed = True
 
-    anthropic_key = os.environ.get("ANTHROPIC_API_KEY", "")
     if anthropic_key and auth_data.get("anthropic", {}).get("apiKey") != anthropic_key:
         auth_data["anthropic"] = {"apiKey": anthropic_key}
         changed = True
@@ -64,6 +113,12 @@ def _ensure_auth() -> None:
     if changed:
         auth_file.write_text(json.dumps(auth_data))
         logger.info("Updated OpenCode auth.json")
+    _auth_fingerprint = fingerprint
+
+
+def _join_text_parts(parts) -> str:
+    """Join the text of a response's ``type == "text"`` parts, one per line."""
+    return "\n".join(p.get("text", "") for p in parts if p.get("type") == "text")
 
 
 class OpenCodeClient:
@@ -71,28 +126,33 @@ class OpenCodeClient:
 
     def __init__(self, directory: str | None = None):
         self.directory = directory or str(settings.vault_path)
-        self.server_process: subprocess.Popen | None = None
+        self.server_process: asyncio.subprocess.Process | None = None
         self.client: httpx.AsyncClient | None = None
         self._server_url: str | None = None
+        # Single-flight: concurrent callers must not each spawn a server
+        self._start_lock = asyncio.Lock()
+        # Untitled session created ahead of time for the next task
+        self._spare_session: asyncio.Task | None = None
 
     async def start_server(self, timeout: int = 30) -> str:
         """Start OpenCode server if not already running."""
         if self._server_url:
             return self._server_url
+        async with self._start_lock:
+            # Another caller may have started it while we waited for the lock
+            if self._server_url:
+                return self._server_url
+            return await self._start_server(timeout)
 
+    async def _start_server(self, timeout: int) -> str:
         # Always ensure auth is up to date
         _ensure_auth()
 
         # Check if server is already running
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(f"{OPENCODE_BASE_URL}/global/health", timeout=2.0)
-                if resp.status_code == 200:
-                    self._server_url = OPENCODE_BASE_URL
-                    logger.info(f"OpenCode server already running at {OPENCODE_BASE_URL}")
-                    return self._server_url
-        except (httpx.ConnectError, httpx.TimeoutException):
-            pass
+        if await self._is_healthy():
+            self._server_url = OPENCODE_BASE_URL
+            logger.info(f"OpenCode server already running at {OPENCODE_BASE_URL}")
+            return self._server_url
 
         # Start OpenCode server
         logger.info("Starting OpenCode server...")
@@ -102,31 +162,30 @@ class OpenCodeClient:
             "model": f"{OPENCODE_PROVIDER_ID}/{OPENCODE_MODEL_ID}",
         }
 
-        self.server_process = subprocess.Popen(
-            ["opencode", "serve", f"--hostname={OPENCODE_HOST}", f"--port={OPENCODE_PORT}"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            env={
-                **os.environ,
-                "OPENCODE_CONFIG_CONTENT": json.dumps(config_content),
-            },
-        )
+        with OPENCODE_LOG_PATH.open("wb") as log:
+            self.server_process = await asyncio.create_subprocess_exec(
+                "opencode", "serve", f"--hostname={OPENCODE_HOST}", f"--port={OPENCODE_PORT}",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=log,
+                env={
+                    **os.environ,
+                    "OPENCODE_CONFIG_CONTENT": json.dumps(config_content),
+                },
+            )
 
-        # Wait for server to be ready
+        # Wait for server to be ready, polling fast at first (50 ms doubling to 500 ms)
         start_time = time.time()
-        while time.time() - start_time < timeout:
-            try:
-                async with httpx.AsyncClient() as client:
-                    resp = await client.get(f"{OPENCODE_BASE_URL}/global/health", timeout=2.0)
-                    if resp.status_code == 200:
-                        self._server_url = OPENCODE_BASE_URL
-                        logger.info(f"OpenCode server started at {OPENCODE_BASE_URL}")
-                        return self._server_url
-            except (httpx.ConnectError, httpx.TimeoutException):
-                await asyncio.sleep(0.5)
-
-        if self.server_process.poll() is not None:
-            stderr = self.server_process.stderr.read().decode() if self.server_process.stderr else ""
+        delay = 0.05
+        while time.time() - start_time < timeout and self.server_process.returncode is None:
+            if await self._is_healthy():
+                self._server_url = OPENCODE_BASE_URL
+                logger.info(f"OpenCode server started at {OPENCODE_BASE_URL}")
+                return self._server_url
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        if self.server_process.returncode is not None:
+            stderr = OPENCODE_LOG_PATH.read_text(errors="replace")[-2000:]
             raise RuntimeError(f"OpenCode server failed to start: {stderr}")
 
         raise RuntimeError(f"OpenCode server did not respond within {timeout}s")
@@ -134,34 +193,55 @@ class OpenCodeClient:
     async def stop_server(self) -> None:
         """Stop OpenCode server if we started it."""
         if self.server_process:
+            # While the server is still up to delete it
+            await self._discard_spare_session()
             logger.info("Stopping OpenCode server...")
             self.server_process.terminate()
             try:
-                self.server_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
+                await asyncio.wait_for(self.server_process.wait(), 5)
+            except asyncio.TimeoutError:
                 self.server_process.kill()
+                await self.server_process.wait()
             self.server_process = None
             self._server_url = None
 
     def _get_client(self) -> httpx.AsyncClient:
-        """Get or create HTTP client."""
+        """Get or create HTTP client (shared by health probes and API calls)."""
         if not self.client:
             self.client = httpx.AsyncClient(
                 base_url=OPENCODE_BASE_URL,
-                timeout=300.0,
+                # Agent runs take minutes; a local server that can't accept in 5 s is down
+                timeout=httpx.Timeout(300.0, connect=5.0),
                 headers={"x-opencode-directory": self.directory},
+                limits=httpx.Limits(
+                    max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0,
+                ),
             )
         return self.client
 
+    async def _is_healthy(self) -> bool:
+        """Probe the server's health endpoint over the pooled client."""
+        try:
+            resp = await self._get_client().get("/global/health", timeout=2.0)
+        except (httpx.ConnectError, httpx.TimeoutException):
+            return False
+        return resp.status_code == 200
+
     async def create_session(self, title: str | None = None) -> dict[str, Any]:
         """Create a new OpenCode session."""
         client = self._get_client()
         body = {}
         if title:
             body["title"] = title
-        resp = await client.post("/session", json=body)
+        resp = await client.post("/session", content=_json_dumps(body), headers=_JSON_HEADERS)
+        resp.raise_for_status()
+        return _json_loads(resp.content)
+
+    async def delete_session(self, session_id: str) -> None:
+        """Delete an OpenCode session."""
+        client = self._get_client()
+        resp = await client.delete(f"/session/{session_id}")
         resp.raise_for_status()
-        return resp.json()
 
     async def send_message(
         self,
@@ -178,7 +258,8 @@ class OpenCodeClient:
 
         if images:
             for image_data, mime_type in images:
-                b64 = base64.b64encode(image_data).decode("ascii")
+                # Straight to str (no intermediate bytes) when pybase64 is installed
+                b64 = _b64encode_str(image_data)
                 parts.append({
                     "type": "file",
                     "mime": mime_type,
@@ -193,13 +274,16 @@ class OpenCodeClient:
         if model:
             body["model"] = model
 
-        resp = await client.post(f"/session/{session_id}/message", json=body)
+        # Bodies carry base64 images, so serialization cost matters here
+        resp = await client.post(
+            f"/session/{session_id}/message", content=_json_dumps(body), headers=_JSON_HEADERS,
+        )
         resp.raise_for_status()
 
         # Handle empty responses gracefully
         if not resp.content:
             return {"info": {}, "parts": []}
-        return resp.json()
+        return _json_loads(resp.content)
 
     async def _extract_text_from_images(
         self,
@@ -210,55 +294,83 @@ class OpenCodeClient:
         """Use the vision model to extract text/content from images.
 
         This is the first step of the two-step process for image handling.
+        More than VISION_GROUP_SIZE images are split into groups extracted
+        concurrently, each in its own session (a session handles one message
+        at a time); results are joined in image order.
         """
-        vision_model = {
-            "providerID": OPENCODE_VISION_PROVIDER_ID,
-            "modelID": OPENCODE_VISION_MODEL_ID,
-        }
-
-        vision_prompt = (
-            "Analyze the attached image(s) and extract ALL visible information:\n"
-            "- If it's a book cover: title, author, subtitle, publisher\n"
-            "- If it's a book page: page number, all readable text, highlights/underlines\n"
-            "- If it's handwritten notes: transcribe everything\n"
-            "- If it's a screenshot: describe and extract text\n"
-            "Mark anything illegible with [illegible]. Do NOT invent text.\n"
-            "Return ONLY the extracted information, no commentary.\n"
-            f"\nUser's context: {context}"
+        if len(images) <= VISION_GROUP_SIZE:
+            return await self._extract_image_group(session_id, images, context)
+
+        groups = [
+            images[i:i + VISION_GROUP_SIZE] for i in range(0, len(images), VISION_GROUP_SIZE)
+        ]
+        extra_sessions = await asyncio.gather(
+            *(self.create_session(title="vision") for _ in groups[1:])
         )
-
+        session_ids = [session_id, *(s["id"] for s in extra_sessions)]
+        texts = await asyncio.gather(*(
+            self._extract_image_group(sid, group, context)
+            for sid, group in zip(session_ids, groups)
+        ))
+        return "\n\n".join(texts)
+
+    async def _extract_image_group(
+        self,
+        session_id: str,
+        images: list[tuple[bytes, str]],
+        context: str,
+    ) -> str:
+        """Run one vision-model extraction over *images* in *session_id*."""
         response = await self.send_message(
-            session_id, vision_prompt, model=vision_model, images=images,
+            session_id, _VISION_PROMPT_PREFIX + context, model=_VISION_MODEL, images=images,
         )
 
-        info = response.get("info", {})
-        error = info.get("error")
-        if error:
-            error_msg = error.get("data", {}).get("message", str(error))
-            raise RuntimeError(f"Vision extraction failed: {error_msg}")
-
-        parts = []
-        for part in response.get("parts", []):
-            if part.get("type") == "text":
-                parts.append(part.get("text", ""))
-
-        return "\n".join(parts)
+        return self._extract_text_parts(response, error_label="Vision extraction failed")
 
     @staticmethod
-    def _extract_text_parts(response: dict[str, Any]) -> str:
+    def _extract_text_parts(
+        response: dict[str, Any], error_label: str = "OpenCode API error",
+    ) -> str:
         """Extract text from response parts, raising on API errors."""
-        info = response.get("info", {})
-        error = info.get("error")
+        error = (response.get("info") or {}).get("error")
         if error:
             error_msg = error.get("data", {}).get("message", str(error))
-            raise RuntimeError(f"OpenCode API error: {error_msg}")
+            raise RuntimeError(f"{error_label}: {error_msg}")
+        return _join_text_parts(response.get("parts") or ())
 
-        text_parts = []
-        for part in response.get("parts", []):
-            if part.get("type") == "text":
-                text_parts.append(part.get("text", ""))
+    async def _take_session(self, title: str | None) -> dict[str, Any]:
+        """Return a fresh session, using the pre-created spare when untitled.
 
-        return "\n".join(text_parts)
+        Sessions keep their message history, so each task still gets its own;
+        creating the next one in the background just takes the round-trip off
+        the task's critical path.
+        """
+        spare, self._spare_session = self._spare_session, None
+        session: dict[str, Any] | None = None
+        if title is None and spare is not None:
+            try:
+                session = await spare
+            except Exception:
+                logger.warning("Pre-created OpenCode session failed, creating a new one")
+        elif spare is not None:
+            self._spare_session = spare
+        if session is None:
+            session = await self.create_session(title=title)
+        if self._spare_session is None:
+            self._spare_session = asyncio.ensure_future(self.create_session())
+            self._spare_session.add_done_callback(_retrieve_spare_error)
+        return session
+
+    async def _discard_spare_session(self) -> None:
+        """Delete the unused pre-created session so it isn't left on the server."""
+        spare, self._spare_session = self._spare_session, None
+        if spare is None:
+            return
+        try:
+            session = await asyncio.wait_for(spare, 5)
+            await self.delete_session(session["id"])
+        except Exception as e:
+            logger.debug("Could not delete spare OpenCode session: %s", e)
 
     async def execute_task(
         self,
@@ -275,14 +387,9 @@ class OpenCodeClient:
         """
         await self.start_server()
 
-        session = await self.create_session(title=session_title)
+        session = await self._take_session(session_title)
         session_id = session["id"]
 
-        default_model = {
-            "providerID": OPENCODE_PROVIDER_ID,
-            "modelID": OPENCODE_MODEL_ID,
-        }
-
         if images:
             # Step 1: Extract content from images using vision model
             extracted = await self._extract_text_from_images(
@@ -298,22 +405,29 @@ class OpenCodeClient:
             )
 
             response = await self.send_message(
-                session_id, augmented_prompt, agent=agent, model=default_model,
+                session_id, augmented_prompt, agent=agent, model=_DEFAULT_MODEL,
             )
         else:
             response = await self.send_message(
-                session_id, prompt, agent=agent, model=default_model,
+                session_id, prompt, agent=agent, model=_DEFAULT_MODEL,
             )
 
         return self._extract_text_parts(response)
 
     async def close(self) -> None:
         """Close the client and optionally stop the server."""
+        await self._discard_spare_session()
         if self.client:
             await self.client.aclose()
             self.client = None
 
 
+def _retrieve_spare_error(task: asyncio.Task) -> None:
+    # A spare nobody awaits would otherwise log "Task exception was never retrieved"
+    if not task.cancelled() and (exc := task.exception()):
+        logger.debug("Pre-creating OpenCode session failed: %s", exc)
+
+
 # Global client instance
 _client: OpenCodeClient | None = None
 
@@ -326,6 +440,12 @@ def get_client() -> OpenCodeClient:
     return _client
 
 
+async def close() -> None:
+    """Close the global client's HTTP connections."""
+    if _client is not None:
+        await _client.close()
+
+
 async def execute_opencode_task(
     prompt: str,
     agent: str | None = None,
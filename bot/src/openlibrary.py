@@ -5,16 +5,120 @@ This module provides functions to search for books using the Open Library API.
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
 
 import httpx
 
 logger = logging.getLogger(__name__)
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 # Open Library API base URL
 OPEN_LIBRARY_BASE_URL = "https://openlibrary.org"
 
+# Shared HTTP client so repeated lookups reuse pooled keep-alive connections
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get or create the shared Open Library HTTP client."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=32, max_keepalive_connections=16, keepalive_expiry=15.0,
+            ),
+        )
+    return _client
+
+
+# Lookup results are cached briefly; concurrent misses on one key share a fetch
+CACHE_TTL = 300.0  # seconds
+CACHE_SIZE = 512
+
+# key -> (stored_at, result); least recently used first
+_cache: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+async def _cached(key: tuple, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Return a fresh cached result for *key*, else await (or join) ``fetch()``.
+
+    Only non-empty results are cached, so failed lookups are retried next time.
+    Cached values are shared between callers and must not be mutated.
+    """
+    hit = _cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < CACHE_TTL:
+        _cache.move_to_end(key)
+        return hit[1]
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _store(key, t))
+    # shield: one caller being cancelled must not cancel the shared fetch
+    return await asyncio.shield(task)
+
+
+def _store(key: tuple, task: asyncio.Task) -> None:
+    _inflight.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    result = task.result()
+    if not result:
+        return
+    _cache[key] = (time.monotonic(), result)
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+# Idempotent GETs are retried on network errors and gateway failures
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.1  # seconds; x4 per attempt, jittered
+RETRY_MAX_DELAY = 1.0
+_RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+async def _get(url: str, **kwargs: Any) -> httpx.Response:
+    """GET through the shared client, retrying transient failures with backoff."""
+    client = _get_client()
+    for attempt in range(1, RETRY_ATTEMPTS):
+        try:
+            response = await client.get(url, **kwargs)
+            if response.status_code not in _RETRY_STATUSES:
+                return response
+        except httpx.TransportError:
+            pass
+        delay = min(RETRY_BASE_DELAY * 4 ** (attempt - 1), RETRY_MAX_DELAY)
+        logger.info("Open Library request failed (attempt %d), retrying: %s", attempt, url)
+        await asyncio.sleep(random.uniform(delay / 2, delay))
+    # Last attempt: whatever happens is the caller's to handle
+    return await client.get(url, **kwargs)
+
+
+async def close() -> None:
+    """Close the shared HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _first(values: list | None) -> Any:
+    """First element of an optional Open Library list field, or None."""
+    return values[0] if values else None
+
 
 async def search_books(query: str, limit: int = 10) -> list[dict[str, Any]]:
     """Search for books by title, author, or general query.
@@ -26,43 +130,47 @@ async def search_books(query: str, limit: int = 10) -> list[dict[str, Any]]:
     Returns:
         List of book dictionaries with basic information
     """
+    key = ("search", query.strip().casefold(), limit)
+    return await _cached(key, lambda: _search_books(query, limit))
+
+
+async def _search_books(query: str, limit: int) -> list[dict[str, Any]]:
     books: list[dict[str, Any]] = []
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Search by general query
-            search_url = f"{OPEN_LIBRARY_BASE_URL}/search.json"
-            params = {
-                "q": query,
-                "limit": limit,
-                "fields": "key,title,author_name,first_publish_year,isbn,publisher,cover_i,number_of_pages_median,ia",
+        # Search by general query
+        search_url = f"{OPEN_LIBRARY_BASE_URL}/search.json"
+        params = {
+            "q": query,
+            "limit": limit,
+            "fields": "key,title,author_name,first_publish_year,isbn,publisher,cover_i,number_of_pages_median",
+        }
+        
+        response = await _get(search_url, params=params)
+        response.raise_for_status()
+        
+        data = _json_loads(response.content)
+        docs = data.get("docs", [])
+        
+        for doc in docs:
+            book = {
+                "key": doc.get("key", ""),
+                "title": doc.get("title", "Unknown"),
+                "author": ", ".join(doc.get("author_name", [])) or "Unknown",
+                "year": doc.get("first_publish_year"),
+                "isbn": _first(doc.get("isbn")),
+                "publisher": _first(doc.get("publisher")),
+                "cover_url": None,
+                "pages": doc.get("number_of_pages_median"),
             }
             
-            response = await client.get(search_url, params=params)
-            response.raise_for_status()
+            # Get cover image
+            cover_i = doc.get("cover_i")
+            if cover_i:
+                book["cover_url"] = f"https://covers.openlibrary.org/b/id/{cover_i}-M.jpg"
             
-            data = response.json()
-            docs = data.get("docs", [])
+            books.append(book)
             
-            for doc in docs:
-                book = {
-                    "key": doc.get("key", ""),
-                    "title": doc.get("title", "Unknown"),
-                    "author": ", ".join(doc.get("author_name", [])) or "Unknown",
-                    "year": doc.get("first_publish_year"),
-                    "isbn": doc.get("isbn", [None])[0] if doc.get("isbn") else None,
-                    "publisher": doc.get("publisher", [None])[0] if doc.get("publisher") else None,
-                    "cover_url": None,
-                    "pages": doc.get("number_of_pages_median"),
-                }
-                
-                # Get cover image
-                cover_i = doc.get("cover_i")
-                if cover_i:
-                    book["cover_url"] = f"https://covers.openlibrary.org/b/id/{cover_i}-M.jpg"
-                
-                books.append(book)
-                
     except httpx.HTTPError as e:
         logger.error(f"Open Library API error: {e}")
     except Exception as e:
@@ -80,54 +188,59 @@ async def get_book_details(work_key: str) -> dict[str, Any] | None:
     Returns:
         Dictionary with detailed book information
     """
+    return await _cached(("details", work_key), lambda: _get_book_details(work_key))
+
+
+async def _get_book_details(work_key: str) -> dict[str, Any] | None:
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            url = f"{OPEN_LIBRARY_BASE_URL}{work_key}.json"
-            response = await client.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Extract relevant fields
-            details = {
-                "key": data.get("key", ""),
-                "title": data.get("title", "Unknown"),
-                "description": None,
-                "subjects": [],
-                "authors": [],
-                "covers": [],
-            }
-            
-            # Get description
-            desc = data.get("description")
-            if isinstance(desc, str):
-                details["description"] = desc
-            elif isinstance(desc, dict):
-                details["description"] = desc.get("value", "")
-            
-            # Get subjects
-            details["subjects"] = data.get("subjects", [])[:10]
-            
-            # Get authors
-            author_refs = data.get("authors", [])
-            if author_refs:
-                author_keys = [a.get("author", {}).get("key") for a in author_refs]
-                for author_key in author_keys[:3]:
-                    if author_key:
-                        author_url = f"{OPEN_LIBRARY_BASE_URL}{author_key}.json"
-                        try:
-                            author_resp = await client.get(author_url)
-                            if author_resp.status_code == 200:
-                                author_data = author_resp.json()
-                                details["authors"].append(author_data.get("name", "Unknown"))
-                        except Exception:
-                            pass
-            
-            # Get covers
-            details["covers"] = data.get("covers", [])
-            
-            return details
-            
+        url = f"{OPEN_LIBRARY_BASE_URL}{work_key}.json"
+        response = await _get(url)
+        response.raise_for_status()
+        
+        data = _json_loads(response.content)
+        
+        # Extract relevant fields
+        details = {
+            "key": data.get("key", ""),
+            "title": data.get("title", "Unknown"),
+            "description": None,
+            "subjects": [],
+            "authors": [],
+            "covers": [],
+        }
+        
+        # Get description
+        desc = data.get("description")
+        if isinstance(desc, str):
+            details["description"] = desc
+        elif isinstance(desc, dict):
+            details["description"] = desc.get("value", "")
+        
+        # Get subjects
+        details["subjects"] = data.get("subjects", [])[:10]
+        
+        # Get authors
+        author_refs = data.get("authors", [])
+        if author_refs:
+            author_keys = [a.get("author", {}).get("key") for a in author_refs]
+            author_urls = [f"{OPEN_LIBRARY_BASE_URL}{k}.json" for k in author_keys[:3] if k]
+            # Independent lookups: fetch concurrently over the pooled client
+            responses = await asyncio.gather(
+                *(_get(url) for url in author_urls), return_exceptions=True,
+            )
+            for author_resp in responses:
+                if isinstance(author_resp, Exception) or author_resp.status_code != 200:
+                    continue
+                try:
+                    details["authors"].append(_json_loads(author_resp.content).get("name", "Unknown"))
+                except Exception:
+                    pass
+        
+        # Get covers
+        details["covers"] = data.get("covers", [])
+        
+        return details
+        
     except httpx.HTTPError as e:
         logger.error(f"Open Library API error: {e}")
     except Exception as e:
@@ -136,6 +249,15 @@ async def get_book_details(work_key: str) -> dict[str, Any] | None:
     return None
 
 
+def _format_book(i: int, book: dict[str, Any]) -> str:
+    cover_url = book.get("cover_url")
+    cover = f"\n   🖼️ Portada: {cover_url}" if cover_url else ""
+    return (
+        f"{i}. *{book.get('title', 'Unknown')}*\n"
+        f"   ✍️ {book.get('author', 'Unknown')} ({book.get('year', '?')}){cover}\n"
+    )
+
+
 def format_book_search_results(books: list[dict[str, Any]], query: str) -> str:
     """Format book search results as a readable string.
     
@@ -149,20 +271,5 @@ def format_book_search_results(books: list[dict[str, Any]], query: str) -> str:
     if not books:
         return f"🔍 No se encontraron libros para: *{query}*"
     
-    lines = [f"🔍 *Resultados para:* \"{query}\"\n"]
-    
-    for i, book in enumerate(books, 1):
-        title = book.get("title", "Unknown")
-        author = book.get("author", "Unknown")
-        year = book.get("year", "?")
-        cover_url = book.get("cover_url")
-        
-        lines.append(f"{i}. *{title}*")
-        lines.append(f"   ✍️ {author} ({year})")
-        
-        if cover_url:
-            lines.append(f"   🖼️ Portada: {cover_url}")
-        
-        lines.append("")
-    
-    return "\n".join(lines)
+    header = f"🔍 *Resultados para:* \"{query}\"\n\n"
+    return header + "\n".join(_format_book(i, book) for i, book in enumerate(books, 1))
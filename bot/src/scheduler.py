@@ -53,6 +53,8 @@ DEFAULT_JOBS: list[ScheduledJob] = [
     ),
 ]
 
+_JOBS_BY_NAME: dict[str, ScheduledJob] = {j.name: j for j in DEFAULT_JOBS}
+
 _JOB_SCHEDULES: dict[str, tuple[tuple[int, ...], int, str]] = {
     "weekly_orphan_check": ((0,), 10, "Lunes 10:00 UTC"),
     "weekly_stale_check": ((2,), 10, "Miércoles 10:00 UTC"),
@@ -62,36 +64,20 @@ _JOB_SCHEDULES: dict[str, tuple[tuple[int, ...], int, str]] = {
 
 
 def _split_message(text: str, max_len: int = 3900) -> list[str]:
-    """Split text into chunks that fit within Telegram's message limit."""
-    if len(text) <= max_len:
-        return [text]
+    """Split text into chunks that fit within Telegram's message limit.
 
+    Cuts after the last newline inside each window (hard cut if there is none),
+    slicing the original string once per chunk.
+    """
     chunks: list[str] = []
-    current = ""
-
-    for line in text.split("\n"):
-        line_with_nl = line + "\n"
-
-        if len(line_with_nl) > max_len:
-            # Flush current buffer first
-            if current:
-                chunks.append(current)
-                current = ""
-            # Hard-split the long line
-            for i in range(0, len(line_with_nl), max_len):
-                piece = line_with_nl[i : i + max_len]
-                chunks.append(piece)
-            continue
-
-        if len(current) + len(line_with_nl) > max_len:
-            chunks.append(current)
-            current = line_with_nl
-        else:
-            current += line_with_nl
-
-    if current:
-        chunks.append(current)
-
+    i, n = 0, len(text)
+    while n - i > max_len:
+        j = text.rfind("\n", i, i + max_len)
+        j = i + max_len if j <= i else j + 1
+        chunks.append(text[i:j])
+        i = j
+    if i < n:
+        chunks.append(text[i:])
     return chunks
 
 
@@ -115,10 +101,13 @@ async def _run_scheduled_job(context: ContextTypes.DEFAULT_TYPE) -> None:
             tb = traceback.format_exc()
             logger.error("Scheduled job %s failed:\n%s", job.name, tb)
             error_msg = f"❌ Error en tarea programada: {job.description}\n\n{tb[-500:]}"
-            for user_id in settings.authorized_user_ids:
-                try:
-                    await context.bot.send_message(chat_id=user_id, text=error_msg)
-                except Exception:
+            user_ids = list(settings.authorized_user_ids)
+            results = await asyncio.gather(
+                *(context.bot.send_message(chat_id=uid, text=error_msg) for uid in user_ids),
+                return_exceptions=True,
+            )
+            for user_id, res in zip(user_ids, results):
+                if isinstance(res, Exception):
                     logger.error("Failed to send error notification to %s", user_id)
             return
 
@@ -128,13 +117,16 @@ async def _run_scheduled_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         full_text = header + result
         chunks = _split_message(full_text)
 
-        for user_id in settings.authorized_user_ids:
+        async def _send_all(user_id: int) -> None:
+            # Sequential per chat so chunks keep their order
             for chunk in chunks:
                 try:
                     await context.bot.send_message(chat_id=user_id, text=chunk)
                 except Exception:
                     logger.error("Failed to send result to user %s", user_id)
 
+        await asyncio.gather(*(_send_all(uid) for uid in settings.authorized_user_ids))
+
 
 def register_scheduled_jobs(app: Application) -> None:
     """Register all enabled scheduled jobs on the application's job queue."""
@@ -162,7 +154,7 @@ def register_scheduled_jobs(app: Application) -> None:
 
 async def run_job_now(job_name: str, bot: Bot) -> str:
     """Run a scheduled job immediately and return the result."""
-    job = next((j for j in DEFAULT_JOBS if j.name == job_name), None)
+    job = _JOBS_BY_NAME.get(job_name)
     if job is None:
         raise ValueError(f"Unknown job: {job_name}")
 
@@ -172,7 +164,7 @@ async def run_job_now(job_name: str, bot: Bot) -> str:
 def list_jobs() -> list[dict]:
     """Return metadata for all scheduled jobs."""
     result = []
-    for job in DEFAULT_JOBS:
+    for job in _JOBS_BY_NAME.values():
         _, _, schedule_description = _JOB_SCHEDULES.get(job.name, ((), 10, "Sin programar"))
         result.append({
             "name": job.name,
@@ -1,44 +1,122 @@
 from __future__ import annotations
 
+import asyncio
+import mmap
+import os
 import re
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
 from pathlib import Path
-from difflib import SequenceMatcher
+
+from rapidfuzz import fuzz, process
 
 from src.config import settings
 from src.models import EntryType, ExtractedEntry
 
+# Worker threads for bulk note reads (file reads release the GIL)
+IO_WORKERS = 16
+# Notes at least this big are scanned through mmap before decoding
+MMAP_MIN_SIZE = 16 * 1024
+
+# Note-editing patterns
+_ILLEGAL_FNAME = re.compile(r'[\\/?*"|<>]')
+_WHITESPACE = re.compile(r"\s+")
+_UPDATED_LINE = re.compile(r"updated: .+")
+_STATUS_LINE = re.compile(r"status: .+")
+_RATING_LINE = re.compile(r"rating:.*")
+_FINISHED_LINE = re.compile(r"\*\*Finished\*\*:.*")
+_PAGE_REF = re.compile(r"p\.(\d+|[a-z]+)", re.IGNORECASE)
+
+# Bumped on every note write so callers can tell cached vault reads are stale
+_generation = 0
+
+
+def generation() -> int:
+    """Contador que aumenta con cada escritura de nota del bot en el vault."""
+    return _generation
+
+
+def _write_note(filepath: Path, content: str) -> None:
+    global _generation
+    _fast_write(filepath, content.encode("utf-8"))
+    _generation += 1
+
+
+def _fast_write(filepath: Path, data: bytes) -> None:
+    # Encode once and write straight to the fd, skipping the text/buffered IO layers
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
+
+@lru_cache(maxsize=2048)
 def sanitize_filename(name: str) -> str:
     sanitized = name.replace(":", " —")
-    illegal = r'[\\/?*"|<>]'
-    sanitized = re.sub(illegal, "", sanitized)
+    sanitized = _ILLEGAL_FNAME.sub("", sanitized)
     sanitized = sanitized.strip(". ")
     if len(sanitized) > 80:
         sanitized = sanitized[:77].rsplit(" ", 1)[0] + "..."
     return sanitized
 
 
-def list_encounters() -> list[str]:
-    path = settings.encounters_path
-    if not path.exists():
+# Directory -> (dir mtime_ns, note stems); creating/deleting a note bumps the dir mtime
+_LIST_CACHE: dict[Path, tuple[int, list[str]]] = {}
+
+
+def _cached_stems(path: Path) -> list[str]:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        _LIST_CACHE.pop(path, None)
         return []
-    return [f.stem for f in path.glob("*.md")]
+    cached = _LIST_CACHE.get(path)
+    if cached is not None and cached[0] == mtime:
+        return list(cached[1])
+    with os.scandir(path) as it:
+        stems = [e.name[:-3] for e in it if e.name.endswith(".md") and e.is_file()]
+    _LIST_CACHE[path] = (mtime, stems)
+    return list(stems)
+
+
+def list_encounters() -> list[str]:
+    return _cached_stems(settings.encounters_path)
 
 
 def find_encounter(title: str) -> str | None:
-    encounters = list_encounters()
+    """
+    Busca el Encounter de un libro: coincidencia exacta, luego subcadena, luego difusa.
+    
+    Args:
+        title: Título del libro tal como llega (se sanea igual que al crear la nota)
+    
+    Returns:
+        Nombre del Encounter existente o None
+    """
     safe_title = sanitize_filename(title).lower()
-    for name in encounters:
-        if name.lower() == safe_title:
+    if not safe_title:
+        return None
+    by_lower: dict[str, str] = {}
+    for name in list_encounters():
+        by_lower.setdefault(name.lower(), name)
+    if exact := by_lower.get(safe_title):
+        return exact
+    for name_lower, name in by_lower.items():
+        if safe_title in name_lower or name_lower in safe_title:
             return name
-        if safe_title in name.lower() or name.lower() in safe_title:
-            return name
-    for name in encounters:
-        ratio = SequenceMatcher(None, safe_title, name.lower()).ratio()
-        if ratio > 0.75:
-            return name
-    return None
+    # Best fuzzy match above 75% (rapidfuzz ratio: Indel/LCS-based, similar to but not the
+    # same as difflib's matching-block ratio; the old thresholds were kept)
+    best = process.extractOne(
+        safe_title, list(by_lower), scorer=fuzz.ratio, processor=None, score_cutoff=75,
+    )
+    return by_lower[best[0]] if best is not None and best[1] > 75 else None
 
 
 def read_encounter(title: str) -> str | None:
@@ -130,51 +208,95 @@ tags:
 
     settings.encounters_path.mkdir(parents=True, exist_ok=True)
     filepath = settings.encounters_path / f"{safe_title}.md"
-    filepath.write_text(content, encoding="utf-8")
+    _write_note(filepath, content)
     return safe_title
 
 
 def _find_section_range(lines: list[str], heading: str) -> tuple[int, int]:
     heading_lower = heading.lower()
+    # Loop invariants of the heading match, computed once instead of per line
+    last_word = heading_lower.split()[-1]
+    hash_count = heading_lower.count("#")
+    heading_level = len(heading.split()[0])
+    # Every match needs a "#"-led line unless the heading itself lacks the "#"
+    only_headings = heading_lower.startswith("#")
+
     start = -1
     for i, line in enumerate(lines):
-        stripped = line.strip().lower()
-        if stripped == heading_lower or (
-            heading_lower.split()[-1] in stripped
-            and stripped.startswith("#")
-            and stripped.count("#") == heading_lower.count("#")
-        ):
-            start = i
-            break
+        stripped = line.strip()
+        if start == -1:
+            if only_headings and not stripped.startswith("#"):
+                continue
+            stripped = stripped.lower()
+            if stripped == heading_lower or (
+                last_word in stripped
+                and stripped.startswith("#")
+                and stripped.count("#") == hash_count
+            ):
+                start = i
+        elif stripped.startswith("#"):
+            # Level is the length of the leading token, so "#tag" lines don't close sections
+            if len(stripped.split(None, 1)[0]) <= heading_level:
+                return start, i
     if start == -1:
         return -1, -1
-
-    heading_level = len(heading.split()[0])
-    end = len(lines)
-    for i in range(start + 1, len(lines)):
-        stripped = lines[i].strip()
-        if stripped.startswith("#"):
-            current_level = len(stripped.split()[0]) if stripped.split() else 0
-            if current_level <= heading_level:
-                end = i
-                break
-    return start, end
-
-
-def _is_duplicate(existing_content: str, new_entry: ExtractedEntry) -> bool:
-    normalized_new = re.sub(r"\s+", " ", new_entry.content.lower().strip())
-    if new_entry.page and f"p.{new_entry.page}" in existing_content:
-        section_text = existing_content.lower()
-        if normalized_new[:50] in section_text:
-            return True
-    for line in existing_content.split("\n"):
-        normalized_line = re.sub(r"\s+", " ", line.lower().strip())
-        if not normalized_line or normalized_line.startswith("#"):
-            continue
-        ratio = SequenceMatcher(None, normalized_new[:100], normalized_line[:100]).ratio()
-        if ratio > 0.80:
-            return True
-    return False
+    return start, len(lines)
+
+
+def _rendered_key(entry: ExtractedEntry) -> str:
+    """Primera línea de contenido del entry tal como se escribe en la nota, normalizada."""
+    for line in entry.to_markdown(timestamp="").split("\n"):
+        normalized = " ".join(line.lower().split())
+        if normalized and not normalized.startswith("#"):
+            return normalized
+    return ""
+
+
+def _is_duplicate(section_lines: list[str], new_entry: ExtractedEntry) -> bool:
+    normalized_new = _WHITESPACE.sub(" ", new_entry.content.lower().strip())
+    if new_entry.page:
+        page_ref = f"p.{new_entry.page}"
+        if any(page_ref in line for line in section_lines):
+            section_text = "\n".join(section_lines).lower()
+            if normalized_new[:50] in section_text:
+                return True
+    existing_lines = {" ".join(line.lower().split()) for line in section_lines}
+    # Retried captures re-submit identical entries: set lookup before any fuzzy scoring
+    if normalized_new and (
+        normalized_new in existing_lines or _rendered_key(new_entry) in existing_lines
+    ):
+        return True
+    candidates = [
+        normalized[:100]
+        for normalized in existing_lines
+        if normalized and not normalized.startswith("#")
+    ]
+    best = process.extractOne(
+        normalized_new[:100], candidates, scorer=fuzz.ratio, processor=None, score_cutoff=80,
+    )
+    return best is not None and best[1] > 80
+
+
+@contextmanager
+def edit_encounter(book_title: str) -> Iterator[list[str]]:
+    """
+    Abre un Encounter para varias ediciones: una lectura al entrar y una escritura al salir.
+    
+    Args:
+        book_title: Título del libro (nombre del Encounter)
+    
+    Yields:
+        Líneas de la nota; se modifican en sitio y solo se escriben si cambiaron
+    
+    Raises:
+        FileNotFoundError: si el Encounter no existe
+    """
+    filepath = settings.encounters_path / f"{book_title}.md"
+    lines = filepath.read_text(encoding="utf-8").split("\n")
+    original = list(lines)
+    yield lines
+    if lines != original:
+        _write_note(filepath, "\n".join(lines))
 
 
 def append_entry(book_title: str, entry: ExtractedEntry) -> dict:
@@ -182,8 +304,21 @@ def append_entry(book_title: str, entry: ExtractedEntry) -> dict:
     if not filepath.exists():
         return {"ok": False, "error": f"Encounter note '{book_title}' not found"}
 
-    content = filepath.read_text(encoding="utf-8")
-    lines = content.split("\n")
+    with edit_encounter(book_title) as lines:
+        return append_entry_lines(lines, entry)
+
+
+def append_entry_lines(lines: list[str], entry: ExtractedEntry) -> dict:
+    """
+    Añade un entry a las líneas de un Encounter abierto con edit_encounter.
+    
+    Args:
+        lines: Líneas de la nota (se modifican en sitio)
+        entry: Entry a añadir en su sección
+    
+    Returns:
+        Dict con 'ok' y 'section', o 'duplicate'/'error' si no se añadió
+    """
     heading = entry.entry_type.section_heading
     start, end = _find_section_range(lines, heading)
 
@@ -191,16 +326,10 @@ def append_entry(book_title: str, entry: ExtractedEntry) -> dict:
         bookmarks_start, bookmarks_end = _find_section_range(lines, "## Bookmarks")
         if bookmarks_start == -1:
             return {"ok": False, "error": f"Section '{heading}' not found and cannot repair"}
-        insert_at = bookmarks_end
-        lines.insert(insert_at, "")
-        lines.insert(insert_at + 1, heading)
-        lines.insert(insert_at + 2, "")
-        content = "\n".join(lines)
-        lines = content.split("\n")
+        lines[bookmarks_end:bookmarks_end] = ["", heading, ""]
         start, end = _find_section_range(lines, heading)
 
-    section_content = "\n".join(lines[start:end])
-    if _is_duplicate(section_content, entry):
+    if _is_duplicate(lines[start:end], entry):
         return {"ok": False, "duplicate": True, "section": heading}
 
     entry_md = entry.to_markdown()
@@ -212,18 +341,41 @@ def append_entry(book_title: str, entry: ExtractedEntry) -> dict:
     else:
         insert_at = start + 1
 
-    entry_lines = [""] + entry_md.split("\n") + [""]
-    for j, line in enumerate(entry_lines):
-        lines.insert(insert_at + j, line)
+    # One splice shifts the tail once instead of once per inserted line
+    lines[insert_at:insert_at] = ["", *entry_md.split("\n"), ""]
 
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    content = "\n".join(lines)
-    content = re.sub(r"updated: .+", f"updated: {now}", content, count=1)
-
-    filepath.write_text(content, encoding="utf-8")
+    _touch_updated(lines, now)
     return {"ok": True, "section": heading}
 
 
+def _touch_updated(lines: list[str], now: str) -> None:
+    """Reescribe en sitio la primera línea 'updated: ...' (como _UPDATED_LINE.sub con count=1)."""
+    _rewrite_first(lines, [("updated: ", _UPDATED_LINE, f"updated: {now}")])
+
+
+def _rewrite_first(lines: list[str], rewrites: list[tuple[str, re.Pattern[str], str]]) -> None:
+    """
+    Aplica cada (marcador, patrón, reemplazo) a la primera línea donde el patrón encaja.
+    
+    Equivale a un patrón.sub(..., count=1) por reescritura sobre el texto unido, pero en
+    una sola pasada; el marcador literal evita lanzar el regex en líneas que no lo contienen.
+    
+    Args:
+        lines: Líneas de la nota (se modifican en sitio)
+        rewrites: Reescrituras pendientes, en el orden en que se aplicarían
+    """
+    pending = list(rewrites)
+    for i, line in enumerate(lines):
+        for rewrite in pending[:]:
+            marker, pattern, repl = rewrite
+            if marker in line and pattern.search(line):
+                line = lines[i] = pattern.sub(repl, line, count=1)
+                pending.remove(rewrite)
+        if not pending:
+            return
+
+
 def update_encounter_status(
     book_title: str,
     status: str | None = None,
@@ -233,19 +385,22 @@ def update_encounter_status(
     if not filepath.exists():
         return False
 
-    content = filepath.read_text(encoding="utf-8")
+    lines = filepath.read_text(encoding="utf-8").split("\n")
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
 
+    rewrites: list[tuple[str, re.Pattern[str], str]] = []
     if status:
-        content = re.sub(r"status: .+", f"status: {status}", content, count=1)
+        rewrites.append(("status: ", _STATUS_LINE, f"status: {status}"))
     if rating is not None:
-        content = re.sub(r"rating:.*", f"rating: {rating}", content, count=1)
+        rewrites.append(("rating:", _RATING_LINE, f"rating: {rating}"))
     if status == "done":
         today = datetime.now().strftime("%Y-%m-%d")
-        content = re.sub(r"\*\*Finished\*\*:.*", f"**Finished**: {today}", content, count=1)
+        rewrites.append(("**Finished**:", _FINISHED_LINE, f"**Finished**: {today}"))
+    rewrites.append(("updated: ", _UPDATED_LINE, f"updated: {now}"))
 
-    content = re.sub(r"updated: .+", f"updated: {now}", content, count=1)
-    filepath.write_text(content, encoding="utf-8")
+    # One pass over the note for every field instead of a full-text sub per field
+    _rewrite_first(lines, rewrites)
+    _write_note(filepath, "\n".join(lines))
     return True
 
 
@@ -314,7 +469,7 @@ tags:
 
     settings.cards_path.mkdir(parents=True, exist_ok=True)
     filepath = settings.cards_path / f"{safe_title}.md"
-    filepath.write_text(content, encoding="utf-8")
+    _write_note(filepath, content)
     return safe_title
 
 
@@ -323,19 +478,21 @@ def add_atomic_reference(book_title: str, card_title: str) -> bool:
     if not filepath.exists():
         return False
 
-    content = filepath.read_text(encoding="utf-8")
+    with edit_encounter(book_title) as lines:
+        add_atomic_reference_lines(lines, card_title)
+    return True
+
+
+def add_atomic_reference_lines(lines: list[str], card_title: str) -> None:
+    """Enlaza una Card en 'Atomic Notes Extracted' de un Encounter abierto con edit_encounter."""
     ref_line = f"- [[{card_title}]]"
 
-    if ref_line in content:
-        return True
+    if any(ref_line in line for line in lines):
+        return
 
-    lines = content.split("\n")
     start, end = _find_section_range(lines, "## Atomic Notes Extracted")
     if start == -1:
-        lines.append("")
-        lines.append("## Atomic Notes Extracted")
-        lines.append("")
-        lines.append(ref_line)
+        lines.extend(["", "## Atomic Notes Extracted", "", ref_line])
     else:
         insert_at = end
         for i in range(end - 1, start, -1):
@@ -346,22 +503,17 @@ def add_atomic_reference(book_title: str, card_title: str) -> bool:
             insert_at = start + 1
         lines.insert(insert_at, ref_line)
 
-    filepath.write_text("\n".join(lines), encoding="utf-8")
-    return True
-
 
 def list_cards() -> list[str]:
-    path = settings.cards_path
-    if not path.exists():
-        return []
-    return [f.stem for f in path.glob("*.md")]
+    return _cached_stems(settings.cards_path)
 
 
 def list_mocs() -> list[str]:
-    atlas_path = settings.vault_path / "Atlas"
-    if not atlas_path.exists():
-        return []
-    return [f.stem.replace("MOC - ", "") for f in atlas_path.glob("MOC - *.md")]
+    return [
+        stem.replace("MOC - ", "")
+        for stem in _cached_stems(settings.vault_path / "Atlas")
+        if stem.startswith("MOC - ")
+    ]
 
 
 # ============================================
@@ -380,59 +532,100 @@ def search_vault(query: str) -> tuple[list[dict], list[dict]]:
         Cada resultado es un dict con 'title', 'snippet', 'path'
     """
     query_lower = query.lower()
-    query_words = query_lower.split()
+    # Case-insensitive patterns instead of lowercased copies of every file
+    query_re = re.compile(re.escape(query_lower), re.IGNORECASE)
+    words_re = _any_word_pattern(query_lower.split())
+    
+    card_paths = [settings.cards_path / f"{name}.md" for name in list_cards()]
+    encounter_paths = [settings.encounters_path / f"{name}.md" for name in list_encounters()]
+    
+    # Scans are read-bound, so they overlap across worker threads
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as pool:
+        cards_scan = pool.map(_scan_card, card_paths, repeat(query_re), repeat(words_re))
+        encounters_scan = pool.map(
+            _scan_encounter, encounter_paths, repeat(query_re), repeat(words_re),
+        )
+        cards_results = [r for r in cards_scan if r is not None]
+        encounters_results = [r for r in encounters_scan if r is not None]
     
-    cards_results: list[dict] = []
-    encounters_results: list[dict] = []
-    
-    # Search in Cards
-    for card_name in list_cards():
-        filepath = settings.cards_path / f"{card_name}.md"
-        if not filepath.exists():
-            continue
-        
-        content = filepath.read_text(encoding="utf-8")
-        content_lower = content.lower()
-        
+    return cards_results, encounters_results
+
+
+def _any_word_pattern(words: list[str]) -> re.Pattern[str] | None:
+    """Patrón que encuentra cualquiera de las palabras (sin distinguir mayúsculas) en una pasada."""
+    if not words:
+        return None
+    # Longest first so a word is not shadowed by one of its prefixes
+    alternatives = sorted(set(words), key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, alternatives)), re.IGNORECASE)
+
+
+def _read_if_matches(
+    filepath: Path, query_re: re.Pattern[str], words_re: re.Pattern[str] | None,
+) -> str | None:
+    """Contenido de la nota si el título o el texto coinciden con la búsqueda."""
+    try:
         # Check if query words appear in title or content
-        if query_lower in card_name.lower() or any(word in content_lower for word in query_words):
-            # Extract snippet around the match
-            snippet = _extract_snippet(content, query_lower, max_length=150)
-            cards_results.append({
-                "title": card_name,
-                "snippet": snippet,
-                "path": str(filepath),
-            })
-    
-    # Search in Encounters
-    for encounter_name in list_encounters():
-        filepath = settings.encounters_path / f"{encounter_name}.md"
-        if not filepath.exists():
-            continue
-        
+        if query_re.search(filepath.stem):
+            return filepath.read_text(encoding="utf-8")
+        if words_re is None:
+            return None
+        words_bytes_re = _bytes_pattern(words_re.pattern)
+        if words_bytes_re is not None and filepath.stat().st_size >= MMAP_MIN_SIZE:
+            # Large note: test the mapped bytes, only decode it when it matches
+            with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if words_bytes_re.search(mm) is None:
+                    return None
         content = filepath.read_text(encoding="utf-8")
-        content_lower = content.lower()
-        
-        if query_lower in encounter_name.lower() or any(word in content_lower for word in query_words):
-            # Find page references
-            pages = _find_page_references(content, query_lower)
-            snippet = f"Menciones en {len(pages)} página(s): {', '.join(pages[:5])}" if pages else _extract_snippet(content, query_lower, max_length=150)
-            encounters_results.append({
-                "title": encounter_name,
-                "snippet": snippet,
-                "path": str(filepath),
-                "pages": pages,
-            })
-    
-    return cards_results, encounters_results
+    except FileNotFoundError:
+        return None
+    return content if words_re.search(content) else None
+
+
+@lru_cache(maxsize=32)
+def _bytes_pattern(pattern: str) -> re.Pattern[bytes] | None:
+    """Versión en bytes de un patrón ASCII (en bytes, IGNORECASE solo pliega ASCII)."""
+    if not pattern.isascii():
+        return None
+    return re.compile(pattern.encode("ascii"), re.IGNORECASE)
+
+
+def _scan_card(
+    filepath: Path, query_re: re.Pattern[str], words_re: re.Pattern[str] | None,
+) -> dict | None:
+    content = _read_if_matches(filepath, query_re, words_re)
+    if content is None:
+        return None
+    # Extract snippet around the match
+    return {
+        "title": filepath.stem,
+        "snippet": _extract_snippet(content, query_re, max_length=150),
+        "path": str(filepath),
+    }
 
 
-def _extract_snippet(content: str, query: str, max_length: int = 150) -> str:
+def _scan_encounter(
+    filepath: Path, query_re: re.Pattern[str], words_re: re.Pattern[str] | None,
+) -> dict | None:
+    content = _read_if_matches(filepath, query_re, words_re)
+    if content is None:
+        return None
+    # Find page references
+    pages = _find_page_references(content, query_re)
+    snippet = f"Menciones en {len(pages)} página(s): {', '.join(pages[:5])}" if pages else _extract_snippet(content, query_re, max_length=150)
+    return {
+        "title": filepath.stem,
+        "snippet": snippet,
+        "path": str(filepath),
+        "pages": pages,
+    }
+
+
+def _extract_snippet(content: str, query_re: re.Pattern[str], max_length: int = 150) -> str:
     """Extrae un fragmento de texto alrededor de la primera aparición del query."""
-    content_lower = content.lower()
-    idx = content_lower.find(query)
+    match = query_re.search(content)
     
-    if idx == -1:
+    if match is None:
         # Just return first lines
         lines = content.split('\n')
         for line in lines:
@@ -440,12 +633,13 @@ def _extract_snippet(content: str, query: str, max_length: int = 150) -> str:
                 return line.strip()[:max_length]
         return content[:max_length]
     
+    idx = match.start()
     start = max(0, idx - 50)
     end = min(len(content), idx + max_length)
     snippet = content[start:end].strip()
     
     # Clean up the snippet
-    snippet = re.sub(r'\s+', ' ', snippet)
+    snippet = _WHITESPACE.sub(' ', snippet)
     if start > 0:
         snippet = "..." + snippet
     if end < len(content):
@@ -454,27 +648,23 @@ def _extract_snippet(content: str, query: str, max_length: int = 150) -> str:
     return snippet
 
 
-def _find_page_references(content: str, query: str) -> list[str]:
+def _find_page_references(content: str, query_re: re.Pattern[str]) -> list[str]:
     """Encuentra todas las referencias de página que contienen el query."""
-    # Pattern to find page references like p.47, p.123
-    page_pattern = re.compile(r'p\.(\d+|[a-z]+)', re.IGNORECASE)
-    
-    pages: list[str] = []
+    pages: set[str] = set()
     lines = content.split('\n')
     
     for line in lines:
-        if query in line.lower():
-            matches = page_pattern.findall(line)
-            for match in matches:
-                pages.append(match)
+        # Page references like p.47, p.123 (cheap literal check before any regex)
+        if "p." not in line and "P." not in line:
+            continue
+        if query_re.search(line):
+            pages.update(_PAGE_REF.findall(line))
     
-    # Deduplicate and sort
-    unique_pages = list(set(pages))
     try:
         # Try to sort numerically
-        return sorted(unique_pages, key=lambda x: int(x) if x.isdigit() else 0)
+        return sorted(pages, key=lambda x: int(x) if x.isdigit() else 0)
     except ValueError:
-        return unique_pages
+        return list(pages)
 
 
 # ============================================
@@ -488,17 +678,17 @@ def get_reading_dashboard() -> list[dict]:
     Returns:
         Lista de dicts con información de cada libro
     """
-    books: list[dict] = []
+    names = list_encounters()
+    paths = [settings.encounters_path / f"{name}.md" for name in names]
+    # Reads release the GIL, so the per-file read + parse overlaps across threads
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as pool:
+        parsed = list(pool.map(_load_dashboard_entry, paths))
     
-    for encounter_name in list_encounters():
-        filepath = settings.encounters_path / f"{encounter_name}.md"
-        if not filepath.exists():
+    books: list[dict] = []
+    for encounter_name, result in zip(names, parsed):
+        if result is None:
             continue
-        
-        content = filepath.read_text(encoding="utf-8")
-        metadata = _parse_encounter_metadata(content)
-        entries_count = count_bookmarks(encounter_name)
-        
+        metadata, entries_count = result
         books.append({
             "title": encounter_name,
             "author": metadata.get("author", ""),
@@ -515,43 +705,63 @@ def get_reading_dashboard() -> list[dict]:
     return books
 
 
+def _load_dashboard_entry(filepath: Path) -> tuple[dict, int] | None:
+    try:
+        content = filepath.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    return _parse_and_count(content, content.split('\n'))
+
+
+def _parse_and_count(content: str, lines: list[str]) -> tuple[dict, int]:
+    """Metadatos y número de bookmarks de un Encounter ya leído (una sola lectura)."""
+    return _parse_encounter_metadata(content), _count_bookmark_lines(lines)
+
+
+# Encounter body fields (frontmatter keys are read line by line)
+_BODY_FINISHED = re.compile(r'\*\*Finished\*\*:[ \t]*(.+)')
+_BODY_AUTHOR = re.compile(r'\*\*Author\*\*:[ \t]*(.+)')
+
+
+def _frontmatter_fields(content: str) -> dict[str, str]:
+    """Pares clave: valor del frontmatter YAML (primera aparición de cada clave)."""
+    if not content.startswith("---\n"):
+        return {}
+    end = content.find("\n---", 3)
+    if end == -1:
+        return {}
+    fields: dict[str, str] = {}
+    for line in content[4:end].split("\n"):
+        key, sep, value = line.partition(":")
+        if sep:
+            fields.setdefault(key.strip(), value.strip())
+    return fields
+
+
 def _parse_encounter_metadata(content: str) -> dict:
     """Extrae metadatos del frontmatter y contenido de un Encounter."""
     metadata: dict = {}
     
     # Parse frontmatter
-    fm_match = re.match(r'^---\n(.*?)\n---', content, re.DOTALL)
-    if fm_match:
-        fm_content = fm_match.group(1)
-        
-        # Extract status
-        status_match = re.search(r'status:\s*(\w+)', fm_content)
-        if status_match:
-            metadata["status"] = status_match.group(1)
-        
-        # Extract rating
-        rating_match = re.search(r'rating:\s*(\d*)', fm_content)
-        if rating_match and rating_match.group(1):
-            metadata["rating"] = int(rating_match.group(1))
-        
-        # Extract author
-        author_match = re.search(r'author:\s*(.+)', fm_content)
-        if author_match:
-            metadata["author"] = author_match.group(1).strip().strip('"')
-        
-        # Extract updated
-        updated_match = re.search(r'updated:\s*(.+)', fm_content)
-        if updated_match:
-            metadata["updated"] = updated_match.group(1).strip()
+    fields = _frontmatter_fields(content)
+    if status := fields.get("status"):
+        metadata["status"] = status
+    rating = fields.get("rating", "")
+    if rating.isdigit():
+        metadata["rating"] = int(rating)
+    if author := fields.get("author", "").strip('"'):
+        metadata["author"] = author
+    if updated := fields.get("updated"):
+        metadata["updated"] = updated
     
     # Extract finished date from content
-    finished_match = re.search(r'\*\*Finished\*\*:\s*(.+)', content)
+    finished_match = _BODY_FINISHED.search(content)
     if finished_match:
         metadata["finished"] = finished_match.group(1).strip()
     
     # Extract author from content (fallback)
     if "author" not in metadata:
-        author_content_match = re.search(r'\*\*Author\*\*:\s*(.+)', content)
+        author_content_match = _BODY_AUTHOR.search(content)
         if author_content_match:
             metadata["author"] = author_content_match.group(1).strip()
     
@@ -572,8 +782,10 @@ def count_bookmarks(book_title: str) -> int:
     if not content:
         return 0
     
-    lines = content.split('\n')
-    
+    return _count_bookmark_lines(content.split('\n'))
+
+
+def _count_bookmark_lines(lines: list[str]) -> int:
     # Find Bookmarks section
     bookmarks_start, bookmarks_end = _find_section_range(lines, "## Bookmarks")
     
@@ -678,9 +890,9 @@ def update_encounter_summary(book_title: str, summary: str, key_ideas: list[str]
     # Update timestamp
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
     content = '\n'.join(lines)
-    content = re.sub(r'updated: .+', f'updated: {now}', content, count=1)
+    content = _UPDATED_LINE.sub(f'updated: {now}', content, count=1)
     
-    filepath.write_text(content, encoding="utf-8")
+    _write_note(filepath, content)
     return True
 
 
@@ -697,8 +909,9 @@ def find_orphan_cards() -> list[dict]:
     """
     orphans: list[dict] = []
     
-    # Get all MOCs for reference
+    # One pattern for every MOC link prefix ([[MOC - X]], [[MOC - X|alias]], ...)
     mocs = list_mocs()
+    moc_link_re = re.compile("|".join(re.escape(f"[[MOC - {m}") for m in mocs)) if mocs else None
     
     for card_name in list_cards():
         filepath = settings.cards_path / f"{card_name}.md"
@@ -708,11 +921,7 @@ def find_orphan_cards() -> list[dict]:
         content = filepath.read_text(encoding="utf-8")
         
         # Check if card links to any MOC
-        has_moc_link = False
-        for moc in mocs:
-            if f"[[MOC - {moc}]]" in content or f"[[MOC - {moc}" in content:
-                has_moc_link = True
-                break
+        has_moc_link = moc_link_re is not None and moc_link_re.search(content) is not None
         
         if not has_moc_link:
             # Extract first lines of content
@@ -753,7 +962,74 @@ def get_moc_contents() -> dict[str, str]:
     return mocs_content
 
 
-def suggest_moc_connections(card_title: str, card_content: str) -> list[str]:
+# Keywords mapped to MOCs (simple keyword matching for suggest_moc_connections)
+_KEYWORD_MOCS: dict[str, tuple[str, ...]] = {
+    "productividad": ("Productivity",),
+    "productivity": ("Productivity",),
+    "trabajo": ("Productivity", "Development"),
+    "work": ("Productivity",),
+    "liderazgo": ("Leadership",),
+    "leadership": ("Leadership",),
+    "gestión": ("Leadership", "Business"),
+    "management": ("Leadership", "Business"),
+    "negocio": ("Business",),
+    "business": ("Business",),
+    "desarrollo": ("Development",),
+    "development": ("Development",),
+    "programming": ("Development",),
+    "código": ("Development",),
+    "code": ("Development",),
+    "finanzas": ("Finance",),
+    "finance": ("Finance",),
+    "money": ("Finance",),
+    "salud": ("Health",),
+    "health": ("Health",),
+    "bienestar": ("Health",),
+    "tecnología": ("Development",),
+    "technology": ("Development",),
+    "tech": ("Development",),
+    "equipo": ("Leadership",),
+    "team": ("Leadership",),
+    "personas": ("People",),
+    "people": ("People",),
+    "arquitectura": ("Development",),
+    "architecture": ("Development",),
+    "estrategia": ("Business", "Leadership"),
+    "strategy": ("Business", "Leadership"),
+}
+
+# Every keyword occurrence in one scan; the lookahead also reports keywords that
+# overlap or sit inside a longer one, like the per-keyword `in` test it replaces
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_KEYWORD_MOCS, key=len, reverse=True))) + "))"
+)
+
+
+def build_moc_index(mocs: list[str] | None = None) -> dict[str, list[str]]:
+    """
+    Construye el índice keyword -> MOCs existentes para suggest_moc_connections.
+    
+    Construirlo una vez y reutilizarlo evita re-escanear Atlas por cada Card.
+    
+    Args:
+        mocs: Lista de MOCs ya obtenida (por defecto list_mocs())
+    
+    Returns:
+        Dict keyword -> MOCs que existen en el vault
+    """
+    existing = set(mocs if mocs is not None else list_mocs())
+    index: dict[str, list[str]] = {}
+    for keyword, targets in _KEYWORD_MOCS.items():
+        if valid := [m for m in targets if m in existing]:
+            index[keyword] = valid
+    return index
+
+
+def suggest_moc_connections(
+    card_title: str,
+    card_content: str,
+    moc_index: dict[str, list[str]] | None = None,
+) -> list[str]:
     """
     Sugiere MOCs relacionados basándose en el contenido de la Card.
     Esta función usa coincidencia simple de palabras clave.
@@ -762,58 +1038,21 @@ def suggest_moc_connections(card_title: str, card_content: str) -> list[str]:
     Args:
         card_title: Título de la Card
         card_content: Contenido de la Card
+        moc_index: Índice de build_moc_index() (se construye si no se pasa)
     
     Returns:
         Lista de MOCs sugeridos
     """
-    # Keywords mapped to MOCs
-    keyword_mocs: dict[str, list[str]] = {
-        "productividad": ["Productivity"],
-        "productivity": ["Productivity"],
-        "trabajo": ["Productivity", "Development"],
-        "work": ["Productivity"],
-        "liderazgo": ["Leadership"],
-        "leadership": ["Leadership"],
-        "gestión": ["Leadership", "Business"],
-        "management": ["Leadership", "Business"],
-        "negocio": ["Business"],
-        "business": ["Business"],
-        "desarrollo": ["Development"],
-        "development": ["Development"],
-        "programming": ["Development"],
-        "código": ["Development"],
-        "code": ["Development"],
-        "finanzas": ["Finance"],
-        "finance": ["Finance"],
-        "money": ["Finance"],
-        "salud": ["Health"],
-        "health": ["Health"],
-        "bienestar": ["Health"],
-        "tecnología": ["Development"],
-        "technology": ["Development"],
-        "tech": ["Development"],
-        "equipo": ["Leadership"],
-        "team": ["Leadership"],
-        "personas": ["People"],
-        "people": ["People"],
-        "arquitectura": ["Development"],
-        "architecture": ["Development"],
-        "estrategia": ["Business", "Leadership"],
-        "strategy": ["Business", "Leadership"],
-    }
+    if moc_index is None:
+        moc_index = build_moc_index()
     
     search_text = (card_title + " " + card_content).lower()
     
     suggested_mocs: set[str] = set()
-    for keyword, mocs in keyword_mocs.items():
-        if keyword in search_text:
-            suggested_mocs.update(mocs)
+    for keyword in set(_KEYWORD_RE.findall(search_text)):
+        suggested_mocs.update(moc_index.get(keyword, ()))
     
-    # Filter to existing MOCs
-    existing_mocs = set(list_mocs())
-    valid_suggestions = list(suggested_mocs.intersection(existing_mocs))
-    
-    return valid_suggestions
+    return list(suggested_mocs)
 
 
 def link_card_to_moc(card_title: str, moc_names: list[str]) -> bool:
@@ -878,9 +1117,9 @@ def link_card_to_moc(card_title: str, moc_names: list[str]) -> bool:
     # Update timestamp
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
     content = '\n'.join(lines)
-    content = re.sub(r'updated: .+', f'updated: {now}', content, count=1)
+    content = _UPDATED_LINE.sub(f'updated: {now}', content, count=1)
     
-    filepath.write_text(content, encoding="utf-8")
+    _write_note(filepath, content)
     return True
 
 
@@ -898,3 +1137,24 @@ def get_card_content(card_title: str) -> str | None:
     if filepath.exists():
         return filepath.read_text(encoding="utf-8")
     return None
+
+
+async def get_card_contents_async(titles: list[str], concurrency: int = 16) -> dict[str, str]:
+    """
+    Lee varias Cards en paralelo (en hilos de trabajo).
+    
+    Args:
+        titles: Títulos de las Cards
+        concurrency: Máximo de lecturas simultáneas
+    
+    Returns:
+        Dict título -> contenido (las Cards que no existen se omiten)
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def read_one(title: str) -> str | None:
+        async with sem:
+            return await asyncio.to_thread(get_card_content, title)
+
+    contents = await asyncio.gather(*(read_one(t) for t in titles))
+    return {t: c for t, c in zip(titles, contents) if c}